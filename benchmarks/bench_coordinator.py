@@ -0,0 +1,279 @@
+"""Offline benchmark suite for chain execution and routing overhead.
+
+Routers are served by the deterministic fake in ``fake_llm.py``, so no API key or network is
+needed and every run takes the same paths. Run from the repository root:
+
+    python benchmarks/bench_coordinator.py --output results.json
+    python benchmarks/bench_coordinator.py --compare results.json --threshold 1.25
+    python benchmarks/bench_coordinator.py --filter linear_chain
+
+Timings are per call of the benchmarked operation: the best, median and mean of ``--repeat``
+rounds, each round timing enough calls to last at least ``--min-time`` seconds. With ``--compare``
+the exit status is 1 when any median regresses by more than ``--threshold`` times the baseline.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")  # routers are served by FakeClients
+
+from fake_llm import FakeClients  # noqa: E402
+from function_chain_coordinator import CallbackPoints, Coordinator, TraceMode, configure_logging  # noqa: E402
+
+# name -> (setup() returning the operation to time, kind); kind is "time" or "memory"
+BENCHMARKS: Dict[str, Tuple[Callable[[], Callable[[], Any]], str]] = {}
+
+
+def benchmark(name: str, kind: str = "time"):
+    def decorator(setup: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = (setup, kind)
+        return setup
+    return decorator
+
+
+def _function(name: str, body: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    # Registration is keyed on __name__, so generated functions need distinct names
+    def function(value):
+        return body(value)
+    function.__name__ = name
+    return function
+
+
+def linear_chain(length: int, **coordinator_options) -> Coordinator:
+    coordinator = Coordinator(clients=FakeClients(), **coordinator_options)
+    previous = None
+    for index in range(length):
+        function = _function(f"step_{index}", lambda value: value + 1)
+        coordinator.register_function(function, int, int)
+        if previous is not None:
+            coordinator.create_edge(previous, function)
+        previous = function
+    coordinator.compile()
+    return coordinator
+
+
+def payload_chain(length: int, items: int) -> Coordinator:
+    """A chain whose every step returns a new list of ``items`` numbers, as large payloads do."""
+    coordinator = Coordinator(clients=FakeClients())
+    previous = None
+    for index in range(length):
+        function = _function(f"step_{index}", lambda value: value[1:] + value[:1])
+        coordinator.register_function(function, list, list)
+        if previous is not None:
+            coordinator.create_edge(previous, function)
+        previous = function
+    coordinator.compile()
+    return coordinator
+
+
+def router_fanout(width: int) -> Coordinator:
+    """entry -> router -> one of ``width`` leaves."""
+    coordinator = Coordinator(clients=FakeClients())
+    entry = _function("entry", lambda value: value)
+    router = _function("router", lambda value: value)
+    coordinator.register_function(entry, int, int)
+    coordinator.register_function(router, int, int, is_router=True, direction_prompt="Pick the leaf for this number.")
+    coordinator.create_edge(entry, router)
+    for index in range(width):
+        leaf = _function(f"leaf_{index}", lambda value: value * 2)
+        coordinator.register_function(leaf, int, int, description_for_routing=f"Handles numbers of kind {index}.")
+        coordinator.create_edge(router, leaf)
+    coordinator.compile()
+    return coordinator
+
+
+for _length in (10, 100, 1000):
+    @benchmark(f"linear_chain[{_length}]")
+    def _setup_linear(length=_length):
+        coordinator = linear_chain(length)
+        return lambda: coordinator.run(0)
+
+    @benchmark(f"linear_chain_trace_none[{_length}]")
+    def _setup_linear_untraced(length=_length):
+        coordinator = linear_chain(length)
+        return lambda: coordinator.run(0, trace=TraceMode.NONE)
+
+
+@benchmark("linear_chain_async[100]")
+def _setup_linear_async():
+    coordinator = linear_chain(100)
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(coordinator.arun(0))
+
+
+for _width in (10, 100):
+    @benchmark(f"router_fanout[{_width}]")
+    def _setup_fanout(width=_width):
+        coordinator = router_fanout(width)
+        inputs = iter(range(10**9))
+        return lambda: coordinator.run(next(inputs))
+
+
+@benchmark("run_batch[100]")
+def _setup_batch():
+    coordinator = router_fanout(10)
+    inputs = list(range(100))
+    return lambda: coordinator.run_batch(inputs, max_batch_size=20)
+
+
+@benchmark("run_sequential[100]")
+def _setup_sequential():
+    # The same 100 inputs as run_batch[100], one run each, for comparison
+    coordinator = router_fanout(10)
+    inputs = list(range(100))
+    return lambda: [coordinator.run(value) for value in inputs]
+
+
+@benchmark("callbacks_heavy[10x10]")
+def _setup_callbacks():
+    """10-node chain with 10 callbacks at every callback point."""
+    coordinator = linear_chain(10)
+    counter = [0]
+
+    def callback(coordinator, system_state):
+        counter[0] += 1
+
+    for point in (CallbackPoints.INITIALIZATION, CallbackPoints.LOOP_START, CallbackPoints.AFTER_NODE_EXECUTION):
+        for _ in range(10):
+            coordinator.add_callback(point, callback)
+    return lambda: coordinator.run(0)
+
+
+for _trace in (TraceMode.FULL, TraceMode.SUMMARY, TraceMode.NONE):
+    @benchmark(f"response_memory[100,{_trace}]", kind="memory")
+    def _setup_memory(trace=_trace):
+        # Small-int payloads are cached by the interpreter, so only a real per-step payload shows
+        # what each trace mode keeps
+        coordinator = payload_chain(100, 1000)
+        payload = list(range(1000))
+        return lambda: coordinator.run(payload, trace=trace)
+
+
+def time_benchmark(operation: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    operation()  # warm up caches and lazily created pools
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        rounds.append((time.perf_counter() - started) / number)
+    return {
+        "unit": "seconds",
+        "number": number,
+        "repeat": repeat,
+        "min": min(rounds),
+        "median": statistics.median(rounds),
+        "mean": statistics.mean(rounds),
+        "stdev": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+    }
+
+
+def memory_benchmark(operation: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Bytes still allocated by the returned object (e.g. a FunctionResponse) after the call."""
+    operation()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = operation()
+        gc.collect()
+        samples.append(tracemalloc.get_traced_memory()[0] - before)
+        tracemalloc.stop()
+        del result
+    return {"unit": "bytes", "repeat": repeat, "min": min(samples), "median": statistics.median(samples), "mean": statistics.mean(samples)}
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    print(f"\n{'benchmark':<36} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None or not previous["median"]:
+            continue
+        ratio = current["median"] / previous["median"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<36} {previous['median']:>12.6g} {current['median']:>12.6g} {ratio:>8.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare medians against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median ratio counted as a regression")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    args = parser.parse_args()
+
+    configure_logging(level=logging.WARNING)
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "commit": _commit(),
+            "timestamp": time.time(),
+        },
+        "benchmarks": {},
+    }
+    for name, (setup, kind) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        operation = setup()
+        if kind == "memory":
+            result = memory_benchmark(operation, args.repeat)
+            print(f"{name:<36} {result['median'] / 1024:12.1f} KiB")
+        else:
+            result = time_benchmark(operation, args.repeat, args.min_time)
+            print(f"{name:<36} {result['median'] * 1e3:12.3f} ms  (min {result['min'] * 1e3:.3f}, n={result['number']}x{result['repeat']})")
+        results["benchmarks"][name] = result
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Routing latency over real HTTP: pooled ``OpenAIClients`` against a new client per decision.
+
+A stand-in for the OpenAI API runs on a local ``http.server`` thread and answers chat completion
+requests the way the fake in ``fake_llm.py`` does, so every routing decision goes through the
+OpenAI SDK, httpx and a TCP connection. Two configurations route the same inputs:
+
+- ``per-call``: a new OpenAI client for every decision, as routers did before ``OpenAIClients``.
+- ``pooled``: one ``OpenAIClients`` whose connections are kept alive between decisions.
+
+Run from the repository root:
+
+    python benchmarks/bench_http_pooling.py --requests 200 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_llm import _INPUT, _names, _pick  # noqa: E402
+from function_chain_coordinator import Coordinator, OpenAIClients, configure_logging  # noqa: E402
+from openai import AsyncOpenAI, OpenAI  # noqa: E402
+
+LEAVES = 4
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive needs HTTP/1.1; without TCP_NODELAY the separate header and body writes stall
+    # on delayed ACKs
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = request["messages"][-1]["content"]
+        choice = {"reasoning_steps": ["benchmark"], "function_name": _pick(_INPUT.search(prompt).group(1), _names(prompt))}
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps({
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps(choice)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20, "total_tokens": len(prompt) // 4 + 20},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PerCallClients(OpenAIClients):
+    """A new SDK client, with its own connection pool, for every request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Closed after the measurement, so closing is not part of the timings
+        self.created: List[Any] = []
+
+    @property
+    def sync(self) -> OpenAI:
+        self.created.append(OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=self.max_retries))
+        return self.created[-1]
+
+    @property
+    def async_(self) -> AsyncOpenAI:
+        self.created.append(AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=self.max_retries))
+        return self.created[-1]
+
+    def close(self):
+        for client in self.created:
+            if isinstance(client, OpenAI):
+                client.close()
+        super().close()
+
+    async def aclose(self):
+        for client in self.created:
+            if isinstance(client, AsyncOpenAI):
+                await client.close()
+        await super().aclose()
+
+
+def router_chain(clients: OpenAIClients) -> Coordinator:
+    coordinator = Coordinator(clients=clients)
+
+    def router(value):
+        return value
+
+    coordinator.register_function(router, str, str, is_router=True, direction_prompt="Pick the leaf for this input.")
+    for index in range(LEAVES):
+        def leaf(value):
+            return value
+        leaf.__name__ = f"leaf_{index}"
+        coordinator.register_function(leaf, str, str, description_for_routing=f"Handles inputs of kind {index}.")
+        coordinator.create_edge(router, leaf)
+    coordinator.compile()
+    return coordinator
+
+
+def timed(decide: Callable[[str], Any], inputs: List[str]) -> List[float]:
+    latencies = []
+    for value in inputs:
+        started = time.perf_counter()
+        decide(value)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def atimed(clients: OpenAIClients, decide: Callable[[str], Any], inputs: List[str]) -> List[float]:
+    latencies = []
+    for value in inputs:
+        started = time.perf_counter()
+        await decide(value)
+        latencies.append(time.perf_counter() - started)
+    # Async clients belong to this event loop
+    await clients.aclose()
+    return latencies
+
+
+def measure(clients: OpenAIClients, inputs: List[str], use_async: bool) -> Dict[str, float]:
+    coordinator = router_chain(clients)
+    router = coordinator.functions["router"]
+    # Warm-up: imports, the pooled connection and the prompt prefixes
+    router.decide_path("warm-up")
+    if use_async:
+        latencies = asyncio.run(atimed(clients, router.adecide_path, inputs))
+    else:
+        latencies = timed(router.decide_path, inputs)
+    coordinator.close()
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200, help="routing decisions per configuration")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in server processing time in seconds")
+    args = parser.parse_args(argv)
+    configure_logging(level=logging.WARNING)
+
+    StandInHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    inputs = [f"input-{index}" for index in range(args.requests)]
+
+    print(f"{'clients':<10} {'api':<6} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    try:
+        for use_async in (False, True):
+            for name, clients_class in (("per-call", PerCallClients), ("pooled", OpenAIClients)):
+                result = measure(clients_class(api_key="benchmark", base_url=base_url), inputs, use_async)
+                print(
+                    f"{name:<10} {'async' if use_async else 'sync':<6} "
+                    f"{result['p50'] * 1000:>8.2f} {result['p95'] * 1000:>8.2f} {result['mean'] * 1000:>8.2f}"
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Per-step overhead of the coordinator's logging on a chain of trivial functions carrying a large
+payload. Run from the repository root:
+
+    python benchmarks/bench_logging.py [--steps 20] [--runs 200] [--payload 100000]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")  # no router is registered, nothing is sent
+
+from function_chain_coordinator import Coordinator, TraceMode, configure_logging  # noqa: E402
+
+
+def build_chain(steps: int) -> Coordinator:
+    coordinator = Coordinator()
+    previous = None
+    for index in range(steps):
+        def step(payload):
+            return payload
+        step.__name__ = f"step_{index}"
+        coordinator.register_function(step, list, list)
+        if previous is not None:
+            coordinator.create_edge(previous, step)
+        previous = step
+    coordinator.compile()
+    return coordinator
+
+
+def per_step_us(coordinator: Coordinator, payload: list, runs: int, steps: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        coordinator.run(payload, trace=TraceMode.NONE)
+    return (time.perf_counter() - started) / (runs * steps) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--payload", type=int, default=100_000, help="number of items in the payload list")
+    args = parser.parse_args()
+
+    sink = io.StringIO()
+    payload = list(range(args.payload))
+    configure_logging(level=logging.WARNING, stream=sink)
+    coordinator = build_chain(args.steps)
+
+    modes = [
+        ("disabled (WARNING)", "color", logging.WARNING),
+        ("INFO, colored", "color", logging.INFO),
+        ("INFO, json", "json", logging.INFO),
+    ]
+    try:
+        for label, style, level in modes:
+            configure_logging(style, level=level, stream=sink)
+            per_step_us(coordinator, payload, 5, args.steps)  # warm up
+            sink.seek(0)
+            sink.truncate()
+            result = per_step_us(coordinator, payload, args.runs, args.steps)
+            print(f"{label:<20} {result:10.2f} us/step  {sink.tell() / (args.runs * args.steps):10.0f} log bytes/step")
+    finally:
+        configure_logging()
+
+if __name__ == "__main__":
+    main()
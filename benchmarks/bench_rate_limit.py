@@ -0,0 +1,114 @@
+"""Routing throughput against a rate-limited LLM endpoint.
+
+The fake endpoint in ``fake_llm.py`` enforces a requests-per-second quota and answers excess
+requests with a 429 and ``retry-after``. Many threads run a router chain in a loop for a fixed
+time, once per configuration:
+
+- ``none``: no client-side limiting. Throttled requests fail their runs.
+- ``adaptive``: a ``RateLimiter`` with no configured quota. It finds the ceiling through retries,
+  ``retry-after`` and the AIMD concurrency limit.
+- ``quota``: a ``RateLimiter`` that also knows the requests-per-minute quota.
+
+Run from the repository root:
+
+    python benchmarks/bench_rate_limit.py --quota 200 --threads 64 --duration 5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_llm import FakeClients  # noqa: E402
+from function_chain_coordinator import AdaptiveConcurrency, Coordinator, RateLimiter, configure_logging  # noqa: E402
+
+
+def router_chain(clients: FakeClients) -> Coordinator:
+    coordinator = Coordinator(clients=clients)
+
+    def entry(value):
+        return value
+
+    def router(value):
+        return value
+
+    def left(value):
+        return value + 1
+
+    def right(value):
+        return value - 1
+
+    coordinator.register_function(entry, int, int)
+    coordinator.register_function(router, int, int, is_router=True, direction_prompt="Pick a side for this number.")
+    coordinator.register_function(left, int, int, description_for_routing="Numbers that go left.")
+    coordinator.register_function(right, int, int, description_for_routing="Numbers that go right.")
+    coordinator.create_edge(entry, router)
+    coordinator.create_edge(router, left)
+    coordinator.create_edge(router, right)
+    coordinator.compile()
+    return coordinator
+
+
+def measure(limiter: Optional[RateLimiter], quota: float, threads: int, duration: float, latency: float) -> Dict[str, Any]:
+    clients = FakeClients(latency, requests_per_second=quota, rate_limiter=limiter)
+    coordinator = router_chain(clients)
+    deadline = time.monotonic() + duration
+    counts = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def worker(seed: int):
+        value = seed
+        while time.monotonic() < deadline:
+            try:
+                coordinator.run(value)
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+            with lock:
+                counts[outcome] += 1
+            value += threads
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.monotonic() - started
+    return {
+        "runs_per_second": counts["ok"] / elapsed,
+        "quota_used": counts["ok"] / elapsed / quota,
+        "failed_runs": counts["failed"],
+        "server_429s": clients.quota.rejected,
+        "concurrency_limit": limiter.stats()["concurrency_limit"] if limiter is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quota", type=float, default=200, help="server quota in requests per second")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per configuration")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated request latency in seconds")
+    args = parser.parse_args(argv)
+    configure_logging(level=logging.CRITICAL)
+
+    configurations = {
+        "none": lambda: None,
+        "adaptive": lambda: RateLimiter(concurrency=AdaptiveConcurrency(initial=8, maximum=args.threads), base_delay=0.05),
+        "quota": lambda: RateLimiter(requests_per_minute=args.quota * 60, concurrency=AdaptiveConcurrency(initial=8, maximum=args.threads), base_delay=0.05),
+    }
+    print(f"{'limiter':<10} {'runs/s':>8} {'of quota':>9} {'failed':>8} {'429s':>8} {'limit':>6}")
+    for name, limiter in configurations.items():
+        result = measure(limiter(), args.quota, args.threads, args.duration, args.latency)
+        print(
+            f"{name:<10} {result['runs_per_second']:>8.1f} {result['quota_used']:>8.0%} {result['failed_runs']:>8} "
+            f"{result['server_429s']:>8} {result['concurrency_limit'] if result['concurrency_limit'] is not None else '-':>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
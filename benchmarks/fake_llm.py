@@ -0,0 +1,140 @@
+"""Deterministic, offline stand-in for ``OpenAIClients`` used by the benchmarks.
+
+The fake reads the candidate function names out of the routing prompt and picks one from a hash of
+the routed input, so the same input always takes the same path and no network call is made. Like
+the real API, it reports the tokens of a prompt prefix it has seen before as ``cached_tokens``,
+and with a ``requests_per_second`` quota it answers requests over the quota with a 429 carrying a
+``retry-after`` header.
+"""
+
+import asyncio
+import collections
+import hashlib
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+import openai
+
+from function_chain_coordinator.function_chain_coordinator import BatchFunctionChoice, FunctionChoice
+
+_FUNCTIONS = re.compile(r"Available functions:\n(.*?)\n", re.S)
+_INPUT = re.compile(r"Given the input: (.*), decide which function to execute next\.")
+_ITEM = re.compile(r"^Item \d+: (.*)$", re.M)
+# Where the variable part of a routing prompt starts
+_VARIABLE = re.compile(r"Given the input: |For each of the following \d+ inputs")
+
+
+def _pick(value: str, names: List[str]) -> str:
+    digest = hashlib.sha256(value.encode()).digest()
+    return names[int.from_bytes(digest[:4], "big") % len(names)]
+
+
+def _names(prompt: str) -> List[str]:
+    listing = _FUNCTIONS.search(prompt).group(1)
+    return [entry.split(":", 1)[0].strip() for entry in re.split(r", (?=\w+:)", listing)]
+
+
+class Quota:
+    """Server-side limit of ``requests_per_second`` over a sliding one-second window."""
+
+    _REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+    def __init__(self, requests_per_second: float):
+        self.requests_per_second = requests_per_second
+        self.rejected = 0
+        self._window: "collections.deque[float]" = collections.deque()
+        self._lock = threading.Lock()
+
+    def admit(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._window and self._window[0] <= now - 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.requests_per_second:
+                self.rejected += 1
+                wait = self._window[0] + 1.0 - now
+                response = httpx.Response(429, headers={"retry-after": f"{wait:.3f}"}, request=self._REQUEST)
+                raise openai.RateLimitError("Rate limit reached for requests", response=response, body=None)
+            self._window.append(now)
+
+
+class FakeCompletions:
+    def __init__(self, latency: float = 0.0, quota: Optional[Quota] = None):
+        self.latency = latency
+        self.quota = quota
+        self.calls = 0
+        self.prefixes = set()
+
+    def _completion(self, messages: List[Dict[str, str]], response_format: Any) -> Any:
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        names = _names(prompt)
+        if response_format is BatchFunctionChoice:
+            parsed = BatchFunctionChoice(choices=[
+                FunctionChoice(reasoning_steps=["benchmark"], function_name=_pick(value, names))
+                for value in _ITEM.findall(prompt)
+            ])
+        else:
+            parsed = FunctionChoice(reasoning_steps=["benchmark"], function_name=_pick(_INPUT.search(prompt).group(1), names))
+        match = _VARIABLE.search(prompt)
+        prefix = messages[0]["content"] + prompt[:match.start() if match else 0]
+        cached_tokens = len(prefix) // 4 if prefix in self.prefixes else 0
+        self.prefixes.add(prefix)
+        usage = SimpleNamespace(
+            prompt_tokens=(len(messages[0]["content"]) + len(prompt)) // 4,
+            completion_tokens=20,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))], usage=usage)
+
+    def parse(self, messages, response_format, **kwargs):
+        if self.quota is not None:
+            self.quota.admit()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._completion(messages, response_format)
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def parse(self, messages, response_format, **kwargs):
+        if self.quota is not None:
+            self.quota.admit()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._completion(messages, response_format)
+
+
+def _client(completions: FakeCompletions) -> Any:
+    chat = SimpleNamespace(completions=completions)
+    return SimpleNamespace(beta=SimpleNamespace(chat=chat), chat=chat)
+
+
+class FakeClients:
+    """Drop-in for ``OpenAIClients``: pass it as ``Coordinator(clients=FakeClients())``.
+
+    ``latency`` adds a simulated per-request delay (seconds); the default of 0 measures only the
+    coordinator's own overhead. ``requests_per_second`` enforces a server-side quota, and
+    ``rate_limiter`` is used like ``OpenAIClients(rate_limiter=...)``.
+    """
+
+    def __init__(self, latency: float = 0.0, requests_per_second: Optional[float] = None, rate_limiter: Any = None):
+        self.quota = Quota(requests_per_second) if requests_per_second else None
+        self.rate_limiter = rate_limiter
+        self.completions = FakeCompletions(latency, self.quota)
+        self.async_completions = FakeAsyncCompletions(latency, self.quota)
+        self.sync = _client(self.completions)
+        self.async_ = _client(self.async_completions)
+
+    @property
+    def calls(self) -> int:
+        return self.completions.calls + self.async_completions.calls
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,225 @@
+"""Stress test for concurrent runs sharing one coordinator.
+
+Many threads (and, with ``--async-runs``, many coroutines) run the same chain at once through a
+router served by the fake in ``fake_llm.py``. Every payload carries its run's token, so any state
+leaking between runs shows up as a step, callback state or final output holding another run's
+token. While the runs are in flight, one thread changes the graph: it adds router branches, swaps
+the routing backend and adds callbacks. New branches change which leaf the fake picks, so each
+concurrent ``FunctionResponse`` must equal what a sequential run taking the same leaf produces.
+The router speculates on its likeliest leaves, and its backend is, half of the time, a cascade of
+learning backends that always defers, so every run teaches them the LLM's choice. The naive Bayes
+tier must end up with exactly one count per lesson.
+Run from the repository root:
+
+    python benchmarks/stress_concurrency.py --threads 32 --runs 2000
+
+The exit status is 1 when any run is wrong.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_llm import FakeClients  # noqa: E402
+from function_chain_coordinator import (  # noqa: E402
+    CallbackPoints,
+    CascadeBackend,
+    Coordinator,
+    FunctionResponse,
+    NaiveBayesBackend,
+    NearestNeighbourBackend,
+    RulesBackend,
+    configure_logging,
+)
+
+LEAVES = 4
+# Branches the churn thread adds to the router, one every BRANCH_EVERY changes
+EXTRA_LEAVES = 12
+BRANCH_EVERY = 25
+ROUTER_OUTPUT = "Router decided the next function."
+
+
+def _function(name: str, suffix: str):
+    def function(value):
+        return f"{value}|{suffix}"
+    function.__name__ = name
+    return function
+
+
+def build(latency: float, violations: List[str]) -> Coordinator:
+    """prepare -> router -> one of ``LEAVES`` leaves -> finish"""
+    coordinator = Coordinator(clients=FakeClients(latency), metrics=True)
+    prepare = _function("prepare", "prepared")
+    router = _function("router", "routed")
+    finish = _function("finish", "done")
+    coordinator.register_function(prepare, str, str)
+    coordinator.register_function(router, str, str, is_router=True, direction_prompt="Pick the leaf for this run.", speculate=2)
+    coordinator.register_function(finish, str, str)
+    coordinator.create_edge(prepare, router)
+    for index in range(LEAVES):
+        leaf = _function(f"leaf_{index}", f"leaf_{index}")
+        coordinator.register_function(leaf, str, str, description_for_routing=f"Handles runs of kind {index}.", pure=True)
+        coordinator.create_edge(router, leaf)
+        coordinator.create_edge(leaf, finish)
+
+    def tag_run(coordinator, state):
+        state["run_token"] = state["input_value"]
+
+    def check_state(coordinator, state):
+        # Callback state is per run: the value at hand must belong to the run that started it
+        if not str(state["input_value"]).startswith(state["run_token"]):
+            violations.append(f"{state['run_token']}: callback state holds {state['input_value']!r}")
+
+    coordinator.add_callback(CallbackPoints.INITIALIZATION, tag_run)
+    coordinator.add_callback(CallbackPoints.INNER_LOOP_START, check_state)
+    coordinator.compile()
+    return coordinator
+
+
+def signature(response: FunctionResponse) -> Tuple[Any, List[Tuple[str, Any, Any]]]:
+    return response.final_output, [(step.function_name, step.input_value, step.output_value) for step in response.steps]
+
+
+def expected_signature(token: str, leaf: str) -> Tuple[Any, List[Tuple[str, Any, Any]]]:
+    """What a sequential run of ``token`` produces when the router picks ``leaf``."""
+    prepared = f"{token}|prepared"
+    routed = f"{prepared}|{leaf}"
+    return f"{routed}|done", [
+        ("prepare", token, prepared),
+        ("router", prepared, ROUTER_OUTPUT),
+        (leaf, prepared, routed),
+        ("finish", routed, f"{routed}|done"),
+    ]
+
+
+def check(token: str, response: FunctionResponse, leaves: List[str]) -> List[str]:
+    errors = []
+    final_output, steps = signature(response)
+    for name, input_value, output_value in steps:
+        # A router step's output describes the decision rather than carrying the payload
+        for value in (input_value,) if name == "router" else (input_value, output_value):
+            if value != token and not str(value).startswith(token + "|"):
+                errors.append(f"{token}: step {name} holds {value!r} from another run")
+    names = [name for name, _, _ in steps]
+    if len(names) != 4 or names[:2] != ["prepare", "router"] or names[2] not in leaves or names[3] != "finish":
+        errors.append(f"{token}: unexpected path {names}")
+    elif (final_output, steps) != expected_signature(token, names[2]):
+        errors.append(f"{token}: differs from a sequential run through {names[2]}")
+    return errors
+
+
+class CountingBayes(NaiveBayesBackend):
+    """Counts what it is taught, so lost updates show up in ``label_counts``."""
+
+    def __init__(self):
+        super().__init__(learn=True)
+        self.taught = 0
+        self._taught_lock = threading.Lock()
+
+    def observe(self, input_value: Any, function_name: str):
+        with self._taught_lock:
+            self.taught += 1
+        super().observe(input_value, function_name)
+
+
+def learner(bayes: CountingBayes) -> CascadeBackend:
+    # No confidence reaches 2, so the cascade always defers and learns from the LLM's decision
+    return CascadeBackend([(NearestNeighbourBackend(learn=True, max_examples=50), 2.0), (bayes, 2.0)])
+
+
+def churn(coordinator: Coordinator, stop: threading.Event, learning: CascadeBackend) -> Dict[str, int]:
+    """Change the graph until ``stop`` is set; returns how many changes of each kind were made."""
+    router = coordinator.functions["router"].func
+    finish = coordinator.functions["finish"].func
+    # The rules backend has no rules, so it always abstains and the LLM still decides
+    backends = [learning, RulesBackend([])]
+    counts = {"branches": 0, "backends": 0, "callbacks": 0}
+    while not stop.is_set():
+        if counts["callbacks"] % BRANCH_EVERY == 0 and counts["branches"] < EXTRA_LEAVES:
+            name = f"extra_{counts['branches']}"
+            leaf = _function(name, name)
+            with coordinator.graph_changes():
+                coordinator.register_function(leaf, str, str, description_for_routing=f"Handles runs of extra kind {counts['branches']}.", pure=True)
+                coordinator.create_edge(router, leaf)
+                coordinator.create_edge(leaf, finish)
+            counts["branches"] += 1
+        coordinator.set_router_backend(router, backends[counts["backends"] % 2])
+        counts["backends"] += 1
+        coordinator.add_callback(CallbackPoints.LOOP_START, lambda coordinator, state: None)
+        counts["callbacks"] += 1
+        coordinator.metrics()
+        time.sleep(0.001)
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=32, help="concurrent threads calling 'run'")
+    parser.add_argument("--runs", type=int, default=2000, help="runs per phase")
+    parser.add_argument("--async-runs", type=int, default=500, help="concurrent 'arun' calls (0 skips the phase)")
+    parser.add_argument("--latency", type=float, default=0.001, help="simulated LLM latency in seconds")
+    args = parser.parse_args(argv)
+    configure_logging(level=logging.WARNING)
+
+    errors: List[str] = []
+    coordinator = build(args.latency, errors)
+    bayes = CountingBayes()
+    learning = learner(bayes)
+    coordinator.set_router_backend(coordinator.functions["router"].func, learning)
+    tokens = [f"run-{index}" for index in range(args.runs)]
+    leaves = [f"leaf_{index}" for index in range(LEAVES)] + [f"extra_{index}" for index in range(EXTRA_LEAVES)]
+    # The expected responses must match runs made one at a time
+    reference = build(0.0, [])
+    for token in tokens:
+        response = reference.run(token)
+        if signature(response) != expected_signature(token, response.steps[2].function_name):
+            errors.append(f"{token}: the sequential run differs from expected_signature")
+    reference.close()
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as side:
+        churned = side.submit(churn, coordinator, stop, learning)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for token, response in zip(tokens, pool.map(coordinator.run, tokens)):
+                errors.extend(check(token, response, leaves))
+        elapsed = time.perf_counter() - start
+        print(f"threads: {args.runs} runs on {args.threads} threads in {elapsed:.2f}s")
+
+        if args.async_runs:
+            async_tokens = tokens[:args.async_runs]
+
+            async def run_all():
+                return await asyncio.gather(*(coordinator.arun(token) for token in async_tokens))
+
+            start = time.perf_counter()
+            responses = asyncio.run(run_all())
+            elapsed = time.perf_counter() - start
+            for token, response in zip(async_tokens, responses):
+                errors.extend(check(token, response, leaves))
+            print(f"async: {len(async_tokens)} concurrent runs in {elapsed:.2f}s")
+        stop.set()
+        counts = churned.result()
+        print(f"graph changes during the runs: {counts['branches']} branches, {counts['backends']} backends, {counts['callbacks']} callbacks")
+    learned = sum(bayes.label_counts.values())
+    print(f"learning backend: taught {bayes.taught} decisions, counted {learned}")
+    if learned != bayes.taught:
+        errors.append(f"naive Bayes lost {bayes.taught - learned} of {bayes.taught} updates")
+
+    coordinator.close()
+    for error in errors[:20]:
+        print("ERROR", error)
+    print("OK" if not errors else f"FAILED: {len(errors)} error(s)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,7 @@ from fastapi import FastAPI, Request, Form, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from function_chain_coordinator import CoordinatorInstance, FunctionResponse
+from function_chain_coordinator import CoordinatorInstance, StreamEvents
 import example_911_dispatcher  # Ensure dispatcher functions are registered
 import os
 import logging
@@ -64,11 +64,15 @@ async def dispatch_call(request: Request, description: str = Form(...)):
     # Get the coordinator instance
     coordinator = CoordinatorInstance.get_instance()
     
-    # Run the coordinator with the description
-    function_response: FunctionResponse = coordinator.run(description)
-    
-    # Extract the final output
-    final_output = function_response.final_output
+    # Stream the run and forward each finished step to the connected WebSocket clients
+    final_output = None
+    async for event in coordinator.astream(description):
+        if event.type == StreamEvents.NODE_FINISHED:
+            await manager.broadcast({"current_node": event.function_name, "input_value": event.input_value, "output_value": event.output_value})
+        elif event.type == StreamEvents.ROUTER_DECIDED:
+            await manager.broadcast({"current_node": event.function_name, "input_value": event.input_value, "output_value": event.next_function})
+        elif event.type == StreamEvents.FINAL_OUTPUT:
+            final_output = event.output_value
     
     return templates.TemplateResponse("result.html", {
         "request": request,
@@ -111,28 +115,6 @@ async def startup_event():
     CoordinatorInstance.initialize(openai_api_key=OPENAI_API_KEY, system_prompt=custom_system_prompt)
     coordinator = CoordinatorInstance.get_instance()
 
-    # Register callback to send data to the FastAPI endpoint
-    import requests
-
-    def send_to_webserver(coordinator_instance, system_state):
-        """
-        Callback function to send execution data to the FastAPI web server.
-        """
-        payload = {
-            "current_node": system_state["current_node"],
-            "input_value": system_state["input_value"],
-            "output_value": system_state["output_value"],
-            "steps": [step.dict() for step in system_state["steps"]]
-        }
-        try:
-            response = requests.post("http://localhost:8000/api/dispatch", json=payload)
-            response.raise_for_status()
-            logger.info("Successfully sent data to the web server.")
-        except requests.RequestException as e:
-            logger.error(f"Failed to send data to the web server: {e}")
-
-    coordinator.add_callback("after_node_execution", send_to_webserver)
-
     logger.info("FastAPI application startup complete.")
 
 
@@ -1,6 +1,6 @@
 # example_scrape_and_route.py
 
-from function_chain_coordinator import CoordinatorInstance, register_function, FunctionResponse
+from function_chain_coordinator import CoordinatorInstance, register_function, FunctionResponse, ExtractiveReducer
 import os
 import requests
 from bs4 import BeautifulSoup
@@ -53,6 +53,9 @@ def send_email_to_accounting(content):
     input_type=str,
     output_type=str,
     is_router=True,
+    # Scraped pages can be huge; route on at most ~2000 tokens of them
+    input_budget=2000,
+    input_reducer=ExtractiveReducer(),
     direction_prompt="""You are picking the next function to run based on the content of the website.
 - If the website content is about machine learning, choose 'send_email_to_engineering'.
 - If the website content is about finance, choose 'send_email_to_accounting'.
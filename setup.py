@@ -8,7 +8,13 @@ setup(
     install_requires=[
         "pydantic",
         "openai",
+        "httpx",
     ],
+    entry_points={
+        "console_scripts": [
+            "coordinator-worker=function_chain_coordinator.worker:main",
+        ],
+    },
     extras_require={
         "dev": [
             "pytest",
@@ -4,10 +4,38 @@ from .function_chain_coordinator import (
     register_function,
     FunctionStep,
     FunctionResponse,
+    StepSummary,
+    TraceMode,
+    StepEvent,
+    StreamEvents,
     FunctionNode,
     RouterNode,
+    RoutingDecision,
+    JoinNode,
+    FanOut,
+    ExecutionPlan,
     CallbackPoints
 )
+from .cache import CacheBackend, CacheStats, InMemoryCache, SQLiteCache
+from .checkpoint import Checkpoint, CheckpointStatus, CheckpointStore, FileCheckpointStore, SQLiteCheckpointStore
+from .clients import OpenAIClients
+from .dispatcher import DeferredCallback, OverflowPolicy
+from .decisions import DecisionLog
+from .jobs import DEFAULT_POOL, Job, JobResult, JobStatus, JobQueue, FileJobQueue, SQLiteJobQueue
+from .metrics import Histogram, Metrics, render_prometheus
+from .logs import ColoredFormatter, JsonFormatter, configure_logging
+from .ratelimit import AdaptiveConcurrency, RateLimiter, TokenBucket
+from .reducers import InputReducer, TruncateReducer, HeadTailReducer, ExtractiveReducer, count_tokens
+from .routing import (
+    RouterBackend,
+    FunctionBackend,
+    RulesBackend,
+    KeywordBackend,
+    NearestNeighbourBackend,
+    ClassifierBackend,
+    CascadeBackend,
+    NaiveBayesBackend
+)
 
 __all__ = [
     'Coordinator',
@@ -15,7 +43,57 @@ __all__ = [
     'register_function',
     'FunctionStep',
     'FunctionResponse',
+    'StepSummary',
+    'TraceMode',
+    'StepEvent',
+    'StreamEvents',
     'FunctionNode',
     'RouterNode',
-    'CallbackPoints'
-]
\ No newline at end of file
+    'RoutingDecision',
+    'JoinNode',
+    'FanOut',
+    'ExecutionPlan',
+    'CallbackPoints',
+    'OpenAIClients',
+    'DeferredCallback',
+    'OverflowPolicy',
+    'Metrics',
+    'Histogram',
+    'render_prometheus',
+    'configure_logging',
+    'ColoredFormatter',
+    'JsonFormatter',
+    'RouterBackend',
+    'FunctionBackend',
+    'RulesBackend',
+    'KeywordBackend',
+    'NearestNeighbourBackend',
+    'ClassifierBackend',
+    'CascadeBackend',
+    'NaiveBayesBackend',
+    'InputReducer',
+    'TruncateReducer',
+    'HeadTailReducer',
+    'ExtractiveReducer',
+    'count_tokens',
+    'DecisionLog',
+    'CacheBackend',
+    'CacheStats',
+    'InMemoryCache',
+    'SQLiteCache',
+    'Checkpoint',
+    'CheckpointStatus',
+    'CheckpointStore',
+    'FileCheckpointStore',
+    'SQLiteCheckpointStore',
+    'DEFAULT_POOL',
+    'Job',
+    'JobResult',
+    'JobStatus',
+    'JobQueue',
+    'FileJobQueue',
+    'SQLiteJobQueue',
+    'RateLimiter',
+    'AdaptiveConcurrency',
+    'TokenBucket'
+]
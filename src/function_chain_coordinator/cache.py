@@ -0,0 +1,175 @@
+# cache.py
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .storage import connect_per_thread
+
+
+class CacheStats:
+    """Hit/miss/eviction counters shared by every cache backend."""
+
+    __slots__ = ("hits", "misses", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hit_rate}
+
+    def __repr__(self):
+        return f"CacheStats(hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+
+
+class CacheBackend:
+    """Interface for key/value caches with LRU size bounds and TTL expiry.
+
+    Keys are strings; values are arbitrary picklable objects. ``get`` returns None on a miss,
+    so ``None`` itself cannot be cached.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1024, ttl: Optional[float] = None):
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer or None.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+
+class InMemoryCache(CacheBackend):
+    """Thread-safe in-process LRU cache with optional TTL."""
+
+    def __init__(self, maxsize: Optional[int] = 1024, ttl: Optional[float] = None):
+        super().__init__(maxsize, ttl)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            stored_at, value = entry
+            if self._expired(stored_at, now):
+                del self._data[key]
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk LRU cache backed by SQLite, shareable between processes on the same host."""
+
+    def __init__(self, path: str, maxsize: Optional[int] = 100_000, ttl: Optional[float] = None):
+        super().__init__(maxsize, ttl)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        # Connections are per thread, but the counters are shared
+        self._stats_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect_per_thread(self._local, self.path)
+
+    def get(self, key: str) -> Any:
+        # Wall-clock time, since entries outlive the process that wrote them
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                with self._stats_lock:
+                    self.stats.misses += 1
+                return None
+            value, stored_at = row
+            if self._expired(stored_at, now):
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                with self._stats_lock:
+                    self.stats.evictions += 1
+                    self.stats.misses += 1
+                return None
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._stats_lock:
+            self.stats.hits += 1
+        return pickle.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, now, now),
+            )
+            if self.maxsize is not None:
+                evicted = conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                ).rowcount
+                with self._stats_lock:
+                    self.stats.evictions += max(evicted, 0)
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
@@ -0,0 +1,226 @@
+# checkpoint.py
+
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, List, NamedTuple, Optional
+
+from .storage import connect_per_thread, dump_atomic
+
+_RUN_ID = re.compile(r"[\w.-]+")
+
+
+class CheckpointStatus:
+    RUNNING = "running"
+    FAILED = "failed"
+    COMPLETED = "completed"
+
+
+class Checkpoint(NamedTuple):
+    """Where a run stands: the next node to execute and its input, plus the steps recorded so far.
+
+    For completed runs ``node`` is None and ``input_value`` holds the final output.
+    """
+    run_id: str
+    node: Optional[str]
+    input_value: Any
+    steps: List[Any]
+    trace: str
+    status: str = CheckpointStatus.RUNNING
+    error: Optional[str] = None
+    updated_at: float = 0.0
+
+
+class CheckpointStore:
+    """Interface for durable checkpoint storage, one checkpoint per run id.
+
+    Checkpoints are pickled, so the payloads flowing through a checkpointed chain must be
+    picklable. With ``keep_completed`` False (the default) a run's checkpoint is deleted once the
+    run completes.
+    """
+
+    def __init__(self, keep_completed: bool = False):
+        self.keep_completed = keep_completed
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        raise NotImplementedError
+
+    def append(self, checkpoint: Checkpoint) -> None:
+        """Move a saved run to a new position. ``checkpoint.steps`` holds only the steps recorded
+        since the run was last saved, which are added to the stored ones.
+
+        Stores override this to write just the new steps; this default rewrites the whole run.
+        """
+        previous = self.load(checkpoint.run_id)
+        self.save(checkpoint._replace(steps=(list(previous.steps) if previous is not None else []) + list(checkpoint.steps)))
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        raise NotImplementedError
+
+    def delete(self, run_id: str) -> None:
+        raise NotImplementedError
+
+    def run_ids(self, status: Optional[str] = None) -> List[str]:
+        """Ids of the stored runs, optionally only those with ``status``."""
+        raise NotImplementedError
+
+
+def _check_run_id(run_id: str) -> str:
+    if not _RUN_ID.fullmatch(run_id):
+        raise ValueError(f"Invalid run id '{run_id}': use letters, digits, '_', '-' and '.'.")
+    return run_id
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Two files per run in ``directory``: ``<run_id>.steps``, the recorded steps pickled one after
+    another and only ever appended to, and ``<run_id>.ckpt``, the position, replaced atomically.
+
+    The position also holds the length of the steps file it covers, so steps written by an append
+    that crashed before its position was replaced are ignored.
+    """
+
+    def __init__(self, directory: str, keep_completed: bool = False):
+        super().__init__(keep_completed)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{_check_run_id(run_id)}.ckpt")
+
+    def _steps_path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{_check_run_id(run_id)}.steps")
+
+    def _position(self, run_id: str) -> Any:
+        """``(checkpoint without steps, steps file length)``; a whole ``Checkpoint`` for runs
+        saved by older versions; None for unknown runs."""
+        try:
+            with open(self._path(run_id), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        steps_path = self._steps_path(checkpoint.run_id)
+        dump_atomic(steps_path, *checkpoint.steps)
+        dump_atomic(self._path(checkpoint.run_id), (checkpoint._replace(steps=[]), os.path.getsize(steps_path)))
+
+    def append(self, checkpoint: Checkpoint) -> None:
+        position = self._position(checkpoint.run_id)
+        if position is None or isinstance(position, Checkpoint):
+            return super().append(checkpoint)
+        steps_path = self._steps_path(checkpoint.run_id)
+        with open(steps_path, "r+b") as f:
+            # Drop anything written after the saved position
+            f.seek(position[1])
+            f.truncate()
+            for step in checkpoint.steps:
+                pickle.dump(step, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        dump_atomic(self._path(checkpoint.run_id), (checkpoint._replace(steps=[]), size))
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        position = self._position(run_id)
+        if position is None or isinstance(position, Checkpoint):
+            return position
+        checkpoint, size = position
+        steps = []
+        if size:
+            with open(self._steps_path(run_id), "rb") as f:
+                while f.tell() < size:
+                    steps.append(pickle.load(f))
+        return checkpoint._replace(steps=steps)
+
+    def delete(self, run_id: str) -> None:
+        for path in (self._path(run_id), self._steps_path(run_id)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def run_ids(self, status: Optional[str] = None) -> List[str]:
+        run_ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".ckpt"))
+        if status is None:
+            return run_ids
+        selected = []
+        for run_id in run_ids:
+            position = self._position(run_id)
+            checkpoint = position if position is None or isinstance(position, Checkpoint) else position[0]
+            if getattr(checkpoint, "status", None) == status:
+                selected.append(run_id)
+        return selected
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoints in a SQLite database, shareable between processes on the same host.
+
+    A run's position is one row of ``checkpoints``; its steps are rows of ``checkpoint_steps``,
+    inserted as they are recorded.
+    """
+
+    def __init__(self, path: str, keep_completed: bool = False):
+        super().__init__(keep_completed)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "run_id TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL, data BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_steps ("
+                "run_id TEXT NOT NULL, seq INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (run_id, seq))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect_per_thread(self._local, self.path)
+
+    def _write(self, conn: sqlite3.Connection, checkpoint: Checkpoint, first_seq: int):
+        steps = [
+            (checkpoint.run_id, first_seq + index, pickle.dumps(step, protocol=pickle.HIGHEST_PROTOCOL))
+            for index, step in enumerate(checkpoint.steps)
+        ]
+        blob = pickle.dumps(checkpoint._replace(steps=[]), protocol=pickle.HIGHEST_PROTOCOL)
+        conn.executemany("INSERT INTO checkpoint_steps (run_id, seq, data) VALUES (?, ?, ?)", steps)
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (run_id, status, updated_at, data) VALUES (?, ?, ?, ?)",
+            (checkpoint.run_id, checkpoint.status, checkpoint.updated_at or time.time(), blob),
+        )
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoint_steps WHERE run_id = ?", (checkpoint.run_id,))
+            self._write(conn, checkpoint, 0)
+
+    def append(self, checkpoint: Checkpoint) -> None:
+        with self._connect() as conn:
+            (next_seq,) = conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM checkpoint_steps WHERE run_id = ?", (checkpoint.run_id,)
+            ).fetchone()
+            self._write(conn, checkpoint, next_seq)
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        conn = self._connect()
+        row = conn.execute("SELECT data FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        checkpoint = pickle.loads(row[0])
+        rows = conn.execute("SELECT data FROM checkpoint_steps WHERE run_id = ? ORDER BY seq", (run_id,)).fetchall()
+        # Rows written by older versions carry their steps in 'data'
+        return checkpoint._replace(steps=list(checkpoint.steps) + [pickle.loads(step) for (step,) in rows])
+
+    def delete(self, run_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM checkpoint_steps WHERE run_id = ?", (run_id,))
+
+    def run_ids(self, status: Optional[str] = None) -> List[str]:
+        if status is None:
+            rows = self._connect().execute("SELECT run_id FROM checkpoints ORDER BY run_id").fetchall()
+        else:
+            rows = self._connect().execute("SELECT run_id FROM checkpoints WHERE status = ? ORDER BY run_id", (status,)).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,96 @@
+# clients.py
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from .ratelimit import RateLimiter
+
+
+class OpenAIClients:
+    """Long-lived, pooled OpenAI clients shared by every router of a coordinator.
+
+    The sync client is created once and is safe to share between threads. Async clients are
+    bound to the event loop they were first used on, so one is kept per running loop. With a
+    ``rate_limiter`` the limiter does the retrying, so the SDK's own retries are turned off.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 2,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OpenAI API key must be provided either via parameter or environment variable 'OPENAI_API_KEY'.")
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        # The limiter must see every throttled response to back off
+        self.max_retries = max_retries if rate_limiter is None else 0
+        self.rate_limiter = rate_limiter
+        self._lock = threading.Lock()
+        self._sync_client: Optional[OpenAI] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+    @property
+    def sync(self) -> OpenAI:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        max_retries=self.max_retries,
+                        http_client=DefaultHttpxClient(limits=self.limits, timeout=self.timeout),
+                    )
+        return self._sync_client
+
+    @property
+    def async_(self) -> AsyncOpenAI:
+        """The async client for the current event loop. Must be called from inside a running loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            with self._lock:
+                client = self._async_clients.get(loop)
+                if client is None:
+                    client = AsyncOpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        max_retries=self.max_retries,
+                        http_client=DefaultAsyncHttpxClient(limits=self.limits, timeout=self.timeout),
+                    )
+                    self._async_clients[loop] = client
+        return client
+
+    def close(self):
+        """Close the sync connection pool. Async clients are released with their event loop."""
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    async def aclose(self):
+        """Close the async connection pool bound to the current event loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
@@ -0,0 +1,64 @@
+# decisions.py
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+
+class DecisionLog:
+    """Append-only JSON-lines log of routing decisions, one object per line.
+
+    Each entry holds the router name, the input's text (truncated to ``max_input_chars``), the chosen
+    function, the LLM's reasoning, the deciding tier and the candidate names. ``sources`` selects
+    which tiers are logged; by default only fresh LLM decisions, which are the training labels.
+    """
+
+    def __init__(self, path: str, sources: Sequence[str] = ("llm",), max_input_chars: int = 4000):
+        self.path = path
+        self.sources = frozenset(sources)
+        self.max_input_chars = max_input_chars
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, router: str, input_value: Any, function_name: str, routed_by: str,
+               reasoning: Optional[Sequence[str]] = None, candidates: Sequence[str] = ()):
+        if routed_by not in self.sources:
+            return
+        entry = {
+            "time": time.time(),
+            "router": router,
+            "input": str(input_value)[:self.max_input_chars],
+            "function_name": function_name,
+            "reasoning": list(reasoning) if reasoning else None,
+            "routed_by": routed_by,
+            "candidates": list(candidates),
+        }
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                # Line buffered, so every decision reaches the file as soon as it is made
+                self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+            self._file.write(line)
+
+    def read(self, router: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Logged entries, oldest first, optionally for one router. Truncated trailing lines are skipped."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if router is None or entry.get("router") == router:
+                    yield entry
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,139 @@
+# dispatcher.py
+
+import asyncio
+import inspect
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# What to do with a new event when a deferred callback's queue is full
+class OverflowPolicy:
+    DROP = "drop"
+    BLOCK = "block"
+
+
+_STOP = object()
+
+
+def _snapshot(system_state: Dict[str, Any]) -> Dict[str, Any]:
+    # The run keeps mutating its state while the event waits in the queue
+    snapshot = dict(system_state)
+    if "steps" in snapshot:
+        snapshot["steps"] = list(snapshot["steps"])
+    return snapshot
+
+
+class DeferredCallback:
+    """Runs a callback on a background thread fed by a bounded queue.
+
+    Calling the instance only enqueues a snapshot of the system state, so the chain never waits on
+    the callback's sink. With ``batch_size`` set, the callback receives a list of up to that many
+    states per call instead of one state.
+    """
+
+    def __init__(
+        self,
+        callback: Callable,
+        max_queue_size: int = 1000,
+        overflow: str = OverflowPolicy.DROP,
+        batch_size: Optional[int] = None,
+    ):
+        if overflow not in (OverflowPolicy.DROP, OverflowPolicy.BLOCK):
+            raise ValueError(f"Invalid overflow policy: {overflow}. Use 'drop' or 'block'.")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.callback = callback
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.delivered = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._coordinator = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def blocking(self) -> bool:
+        return self.overflow == OverflowPolicy.BLOCK
+
+    def __call__(self, coordinator, system_state: Dict[str, Any]):
+        self._coordinator = coordinator
+        self._ensure_started()
+        event = _snapshot(system_state)
+        if self.blocking:
+            self._queue.put(event)
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    name = getattr(self.callback, "__name__", type(self.callback).__name__)
+                    self._thread = threading.Thread(target=self._worker, name=f"fcc-callback-{name}", daemon=True)
+                    self._thread.start()
+
+    def _worker(self):
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                self._queue.task_done()
+                return
+            events = [event]
+            stop = False
+            if self.batch_size is not None:
+                while len(events) < self.batch_size:
+                    try:
+                        extra = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if extra is _STOP:
+                        stop = True
+                        break
+                    events.append(extra)
+            self._deliver(events)
+            for _ in range(len(events) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _deliver(self, events: List[Dict[str, Any]]):
+        payloads = [events] if self.batch_size is not None else events
+        for payload in payloads:
+            try:
+                result = self.callback(self._coordinator, payload)
+                if inspect.isawaitable(result):
+                    # Worker threads have no event loop of their own
+                    asyncio.run(result)
+            except Exception as e:
+                logger.error("Error in deferred callback: %s", e)
+        self.delivered += len(events)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event has been delivered. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Deliver pending events, then stop the worker thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
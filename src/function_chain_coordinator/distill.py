@@ -0,0 +1,114 @@
+# distill.py
+"""Distill routing decisions recorded in a ``DecisionLog`` into local router backends.
+
+    python -m function_chain_coordinator.distill train decisions.jsonl --router route_call --output route_call.json
+    python -m function_chain_coordinator.distill evaluate decisions.jsonl --router route_call --model route_call.json
+"""
+
+import argparse
+import json
+import random
+import sys
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .decisions import DecisionLog
+from .routing import NaiveBayesBackend, RouterBackend
+
+# Confidence thresholds reported by 'evaluate' when none are given
+DEFAULT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+
+def _split(entries: List[Dict[str, Any]], holdout: float, seed: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    shuffled = list(entries)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout))
+    return shuffled[:cut], shuffled[cut:]
+
+
+class _Candidate:
+    """Stand-in for a FunctionNode when scoring logged entries offline."""
+
+    __slots__ = ("func", "description_for_routing")
+
+    def __init__(self, name: str):
+        self.func = SimpleNamespace(__name__=name)
+        self.description_for_routing = None
+
+
+def evaluate(backend: RouterBackend, entries: Sequence[Dict[str, Any]], thresholds: Sequence[float] = DEFAULT_THRESHOLDS) -> Dict[str, Any]:
+    """Agreement of ``backend`` with the logged decisions.
+
+    For each threshold: ``coverage`` is the share of entries the backend would answer locally, and
+    ``agreement`` how often those answers match the logged choice.
+    """
+    scored = []
+    for entry in entries:
+        names = entry.get("candidates") or [entry["function_name"]]
+        choice, confidence, _ = backend.decide(entry["input"], [_Candidate(name) for name in names])
+        scored.append((choice, confidence, entry["function_name"]))
+    total = len(scored)
+    report: Dict[str, Any] = {
+        "entries": total,
+        "agreement": sum(1 for choice, _, label in scored if choice == label) / total if total else 0.0,
+        "thresholds": {},
+    }
+    for threshold in thresholds:
+        covered = [(choice, label) for choice, confidence, label in scored if choice is not None and confidence >= threshold]
+        report["thresholds"][str(threshold)] = {
+            "coverage": len(covered) / total if total else 0.0,
+            "agreement": sum(1 for choice, label in covered if choice == label) / len(covered) if covered else 0.0,
+        }
+    return report
+
+
+def train(
+    log: DecisionLog,
+    router: str,
+    holdout: float = 0.2,
+    seed: int = 0,
+    thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+) -> Tuple[NaiveBayesBackend, Dict[str, Any]]:
+    """Train a ``NaiveBayesBackend`` on a router's logged decisions.
+
+    A ``holdout`` share of entries is kept back to evaluate the model, which is then refit on every
+    entry. Returns the model and the holdout report.
+    """
+    entries = list(log.read(router))
+    if not entries:
+        raise ValueError(f"No logged decisions for router '{router}' in {log.path}.")
+    training, held_out = _split(entries, holdout, seed)
+    model = NaiveBayesBackend().fit([entry["input"] for entry in training], [entry["function_name"] for entry in training])
+    report = evaluate(model, held_out, thresholds) if held_out else {"entries": 0}
+    report["trained_on"] = len(entries)
+    model.fit([entry["input"] for entry in entries], [entry["function_name"] for entry in entries])
+    return model, report
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m function_chain_coordinator.distill", description="Distill logged routing decisions into a local model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="train a model from a decision log")
+    train_parser.add_argument("log")
+    train_parser.add_argument("--router", required=True)
+    train_parser.add_argument("--output", required=True, help="where to write the model (JSON)")
+    train_parser.add_argument("--holdout", type=float, default=0.2)
+    train_parser.add_argument("--seed", type=int, default=0)
+    evaluate_parser = commands.add_parser("evaluate", help="measure a model's agreement with a decision log")
+    evaluate_parser.add_argument("log")
+    evaluate_parser.add_argument("--router", required=True)
+    evaluate_parser.add_argument("--model", required=True)
+    args = parser.parse_args(argv)
+
+    log = DecisionLog(args.log)
+    if args.command == "train":
+        model, report = train(log, args.router, args.holdout, args.seed)
+        model.save(args.output)
+    else:
+        report = evaluate(NaiveBayesBackend.load(args.model), list(log.read(args.router)))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
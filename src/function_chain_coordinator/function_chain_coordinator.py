@@ -1,68 +1,167 @@
 # function_chain_coordinator.py
 
+import asyncio
+import contextlib
+import hashlib
+import importlib
+import inspect
+import json
 import logging
-from typing import Any, Callable, Dict, List, Optional, Tuple
-from functools import wraps
-from pydantic import BaseModel, ValidationError, field_validator
+import marshal
+import pickle
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union, get_args, get_origin
+from functools import partial
+from pydantic import BaseModel, PrivateAttr, ValidationError, computed_field, field_validator
 import openai
 import os
-from openai import OpenAI
-
-# ANSI color codes for colored logging
-class Colors:
-    HEADER = '\033[95m'
-    OKBLUE = '\033[94m'
-    OKCYAN = '\033[96m'
-    OKGREEN = '\033[92m'
-    WARNING = '\033[93m'
-    FAIL = '\033[91m'
-    ENDC = '\033[0m'
-    BOLD = '\033[1m'
-    UNDERLINE = '\033[4m'
-
-# Configure logging with color support
-class ColoredFormatter(logging.Formatter):
-    """Custom logging formatter to add colors based on log level."""
-
-    def format(self, record):
-        levelno = record.levelno
-        if levelno >= logging.ERROR:
-            color = Colors.FAIL
-        elif levelno >= logging.WARNING:
-            color = Colors.WARNING
-        elif levelno >= logging.INFO:
-            color = Colors.OKGREEN
-        elif levelno >= logging.DEBUG:
-            color = Colors.OKCYAN
-        else:
-            color = Colors.ENDC
-        record.msg = f"{color}{record.msg}{Colors.ENDC}"
-        return super().format(record)
 
-# Set up colored logging
-handler = logging.StreamHandler()
-handler.setFormatter(ColoredFormatter('%(levelname)s: %(message)s'))
+from .cache import CacheBackend, InMemoryCache
+from .checkpoint import Checkpoint, CheckpointStatus, CheckpointStore
+from .clients import OpenAIClients
+from .dispatcher import DeferredCallback, OverflowPolicy
+from .decisions import DecisionLog
+from .jobs import DEFAULT_POOL, Job, JobQueue, JobStatus
+# Colors and ColoredFormatter stay importable from here for existing code
+from .logs import Colors, ColoredFormatter, preview
+from .metrics import Metrics, render_prometheus
+from .reducers import HeadTailReducer, InputReducer, count_tokens
+from .routing import RouterBackend, _confidence
+
 logger = logging.getLogger(__name__)
-logger.handlers = [handler]
-logger.setLevel(logging.INFO)
 
 # Callback type
-Callback = Callable[['Coordinator', Dict[str, Any]], None]
+Callback = Callable[['Coordinator', Dict[str, Any]], Union[None, Awaitable[None]]]
+
+def _run_coroutine_sync(coro: Awaitable[Any]) -> Any:
+    """Drive a coroutine to completion from synchronous code."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    coro.close()
+    raise RuntimeError("Cannot run an async function from the synchronous API inside a running event loop. Use 'arun' instead.")
+
+# Trace modes: what a run records for each executed step
+class TraceMode:
+    NONE = "none"
+    SUMMARY = "summary"
+    FULL = "full"
 
 class FunctionStep(BaseModel):
     function_name: str
     input_value: Any
     output_value: Any
+    duration: Optional[float] = None
+    # Router steps only: the tier that chose the next function and its confidence
+    routed_by: Optional[str] = None
+    confidence: Optional[float] = None
+    # True when the output came from the function's cache instead of a call
+    cached: bool = False
 
     @field_validator('input_value', 'output_value', mode='before')
     def not_none(cls, v, info):
         if v is None:
-            raise ValueError(f"{info.field.name} cannot be None")
+            raise ValueError(f"{info.field_name} cannot be None")
         return v
 
+class StepSummary(BaseModel):
+    function_name: str
+    duration: Optional[float] = None
+    input_size: Optional[int] = None
+    output_size: Optional[int] = None
+    routed_by: Optional[str] = None
+    confidence: Optional[float] = None
+    cached: bool = False
+
+def _payload_size(value: Any) -> int:
+    """Approximate size of a payload in bytes (characters for text)."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+class _StepRecord:
+    """Compact per-step record kept during a run; converted to pydantic models only on demand."""
+
+    __slots__ = ("function_name", "input_value", "output_value", "duration", "input_size", "output_size", "routed_by", "confidence", "cached")
+
+    def __init__(
+        self,
+        function_name: str,
+        input_value: Any,
+        output_value: Any,
+        duration: float,
+        trace: str,
+        routed_by: Optional[str] = None,
+        confidence: Optional[float] = None,
+        cached: bool = False,
+    ):
+        self.function_name = function_name
+        self.duration = duration
+        self.routed_by = routed_by
+        self.confidence = confidence
+        self.cached = cached
+        if trace == TraceMode.FULL:
+            self.input_value = input_value
+            self.output_value = output_value
+            self.input_size = self.output_size = None
+        else:
+            # Summaries only keep sizes, so large payloads aren't held alive
+            self.input_value = self.output_value = None
+            self.input_size = _payload_size(input_value)
+            self.output_size = _payload_size(output_value)
+
+    def to_step(self) -> FunctionStep:
+        return FunctionStep(
+            function_name=self.function_name, input_value=self.input_value, output_value=self.output_value,
+            duration=self.duration, routed_by=self.routed_by, confidence=self.confidence, cached=self.cached,
+        )
+
+    def to_summary(self) -> StepSummary:
+        if self.input_size is None:
+            input_size, output_size = _payload_size(self.input_value), _payload_size(self.output_value)
+        else:
+            input_size, output_size = self.input_size, self.output_size
+        return StepSummary(
+            function_name=self.function_name, duration=self.duration, input_size=input_size, output_size=output_size,
+            routed_by=self.routed_by, confidence=self.confidence, cached=self.cached,
+        )
+
+    def model_dump(self) -> Dict[str, Any]:
+        if self.input_size is None:
+            return {
+                "function_name": self.function_name, "input_value": self.input_value, "output_value": self.output_value,
+                "duration": self.duration, "routed_by": self.routed_by, "confidence": self.confidence, "cached": self.cached,
+            }
+        return self.to_summary().model_dump()
+
+    # Callbacks written against FunctionStep use the pydantic v1 spelling
+    dict = model_dump
+
 class FunctionResponse(BaseModel):
-    steps: List[FunctionStep]
     final_output: Any
+    trace: str = TraceMode.FULL
+    # Set for checkpointed runs; see 'Coordinator.resume'
+    run_id: Optional[str] = None
+    _steps: Optional[List[FunctionStep]] = PrivateAttr(default=None)
+    _records: Sequence[_StepRecord] = PrivateAttr(default=())
+
+    def __init__(self, steps: Optional[Sequence[Any]] = None, records: Optional[Sequence[_StepRecord]] = None, **data):
+        super().__init__(**data)
+        if steps is not None:
+            self._steps = [FunctionStep.model_validate(step) for step in steps]
+        self._records = records or ()
 
     @field_validator('final_output', mode='before')
     def final_output_not_none(cls, v, info):
@@ -70,6 +169,42 @@ class FunctionResponse(BaseModel):
             raise ValueError("final_output cannot be None")
         return v
 
+    @computed_field
+    @property
+    def steps(self) -> List[FunctionStep]:
+        """Executed steps with their inputs and outputs; empty unless the run used trace mode 'full'."""
+        if self._steps is None:
+            self._steps = [record.to_step() for record in self._records] if self.trace == TraceMode.FULL else []
+        return self._steps
+
+    def step_summaries(self) -> List[StepSummary]:
+        """Names, timings and payload sizes of executed steps ('summary' and 'full' trace modes)."""
+        if self._records:
+            return [record.to_summary() for record in self._records]
+        return [
+            StepSummary(function_name=step.function_name, duration=step.duration, input_size=_payload_size(step.input_value), output_size=_payload_size(step.output_value))
+            for step in self.steps
+        ]
+
+# Stream event types yielded by 'Coordinator.stream' and 'Coordinator.astream'
+class StreamEvents:
+    NODE_STARTED = "node_started"
+    ROUTER_DECIDED = "router_decided"
+    NODE_FINISHED = "node_finished"
+    FINAL_OUTPUT = "final_output"
+
+class StepEvent(BaseModel):
+    type: str
+    function_name: Optional[str] = None
+    input_value: Any = None
+    output_value: Any = None
+    next_function: Optional[str] = None
+    routed_by: Optional[str] = None
+    confidence: Optional[float] = None
+    cached: bool = False
+    duration: Optional[float] = None
+    response: Optional[FunctionResponse] = None
+
 class FunctionChoice(BaseModel):
     reasoning_steps: List[str]
     function_name: str
@@ -77,20 +212,233 @@ class FunctionChoice(BaseModel):
     @field_validator('reasoning_steps', 'function_name', mode='before')
     def not_none(cls, v, info):
         if v is None:
-            raise ValueError(f"{info.field.name} cannot be None")
+            raise ValueError(f"{info.field_name} cannot be None")
         return v
 
+class BatchFunctionChoice(BaseModel):
+    choices: List[FunctionChoice]
+
+def _normalize_routing_input(value: Any) -> Optional[str]:
+    """Canonical form of a routing input for the routing cache key, with whitespace collapsed in
+    plain strings. None when the input has no stable form, so its decision isn't cached."""
+    if type(value) is str:
+        value = re.sub(r"\s+", " ", value).strip()
+    try:
+        return _dump(_canonical(value))
+    except (TypeError, ValueError, RecursionError):
+        return _stable_input_hash(value)
+
+def _canonical(value: Any) -> Any:
+    """A JSON-encodable form of ``value`` that keeps container types apart: every container becomes
+    a ``[type, items]`` pair, so ``(1, 2)``, ``[1, 2]`` and ``{1, 2}`` don't encode alike. Raises
+    TypeError for anything else, subclasses included."""
+    kind = type(value)
+    if value is None or kind in (bool, int, float, str):
+        return value
+    if isinstance(value, BaseModel):
+        return ["model", kind.__qualname__, value.model_dump(mode="json")]
+    if kind is dict:
+        if all(type(key) is str for key in value):
+            return ["dict", {key: _canonical(item) for key, item in value.items()}]
+        return ["dict_items", sorted(([_canonical(key), _canonical(item)] for key, item in value.items()), key=_dump)]
+    if kind in (list, tuple):
+        return [kind.__name__, [_canonical(item) for item in value]]
+    if kind in (set, frozenset):
+        return [kind.__name__, sorted((_canonical(item) for item in value), key=_dump)]
+    if kind in (bytes, bytearray):
+        return [kind.__name__, value.hex()]
+    raise TypeError(f"{kind.__name__} has no canonical form")
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+def _stable_input_hash(value: Any) -> Optional[str]:
+    """Hash of an input that is the same in every process: canonical JSON where possible, else the
+    pickle. None for inputs that can be neither."""
+    try:
+        payload = _dump(_canonical(value)).encode()
+    except (TypeError, ValueError, RecursionError):
+        try:
+            payload = pickle.dumps(value, protocol=4)
+        except Exception:
+            return None
+    return f"{type(value).__module__}.{type(value).__qualname__}:{hashlib.sha256(payload).hexdigest()}"
+
+def _function_fingerprint(func: Callable) -> str:
+    """The function's identity and a hash of its bytecode, so editing the function invalidates its cache."""
+    func = inspect.unwrap(func)
+    parts = [getattr(func, "__module__", None) or "", getattr(func, "__qualname__", None) or repr(func)]
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        parts.append(hashlib.sha256(marshal.dumps(code)).hexdigest())
+    return "\x00".join(parts)
+
+class RoutingDecision(NamedTuple):
+    """A router's choice and the tier that made it: a backend's name, 'cache' or 'llm'."""
+    node: 'FunctionNode'
+    routed_by: str
+    # Backend confidence; None for cache and LLM decisions
+    confidence: Optional[float] = None
+    # The LLM's reasoning steps, for fresh LLM decisions
+    reasoning: Optional[List[str]] = None
+
 class FunctionNode:
-    def __init__(self, func: Callable, input_type: type, output_type: type, description_for_routing: Optional[str] = None):
+    def __init__(
+        self,
+        func: Callable,
+        input_type: type,
+        output_type: type,
+        description_for_routing: Optional[str] = None,
+        batched: bool = False,
+        executor: Optional[str] = None,
+        pure: bool = False,
+        cache: Optional[CacheBackend] = None,
+    ):
+        if executor not in (None, "process"):
+            raise ValueError(f"Unknown executor '{executor}'. Use None (in-process) or 'process'.")
+        if executor == "process":
+            if inspect.iscoroutinefunction(func):
+                raise ValueError(f"Async function '{func.__name__}' cannot run on the process pool.")
+            try:
+                pickle.dumps(func)
+            except Exception as e:
+                raise TypeError(f"Function '{func.__name__}' must be picklable (defined at module level) to use executor='process': {e}")
         self.func = func
         self.input_type = input_type
         self.output_type = output_type
         self.description_for_routing = description_for_routing
         self.edges: List['FunctionNode'] = []
+        # Targets that run concurrently after this node and converge on a JoinNode
+        self.parallel_edges: List['FunctionNode'] = []
+        self.is_async = inspect.iscoroutinefunction(func)
+        # Batched functions take a sequence of inputs and return a sequence of outputs of the same length
+        self.batched = batched
+        # 'process' nodes run on the coordinator's worker pool; the coordinator sets 'process_pool'
+        self.executor = executor
+        self.process_pool: Optional[Callable[[], Executor]] = None
+        # Pure functions have no side effects and don't mutate their input, so routers may run them speculatively
+        self.pure = pure
+        # Memoized outputs keyed by 'cache_key'; None calls the function every time
+        self.cache = cache
+        self._fingerprint: Optional[str] = None
+        # Worker pool that executes this node for submitted runs; see 'Coordinator.work'
+        self.pool = DEFAULT_POOL
+
+    def _invoke(self, argument: Any) -> Any:
+        if self.process_pool is not None:
+            return self.process_pool().submit(self.func, argument).result()
+        result = self.func(argument)
+        if self.is_async:
+            result = _run_coroutine_sync(result)
+        return result
+
+    def _check_batch_output(self, outputs: Any, expected: int) -> Sequence[Any]:
+        try:
+            count = len(outputs)
+        except TypeError:
+            raise TypeError(f"Batched function '{self.func.__name__}' must return a sequence, got {type(outputs).__name__}.")
+        if count != expected:
+            raise ValueError(f"Batched function '{self.func.__name__}' returned {count} output(s) for {expected} input(s).")
+        return outputs
+
+    def _call_batched(self, input_values: List[Any]) -> Sequence[Any]:
+        return self._check_batch_output(self._invoke(input_values), len(input_values))
 
     def execute(self, input_value: Any) -> Any:
-        logger.info(f"Executing {Colors.OKBLUE}{self.func.__name__}{Colors.ENDC} with input: {Colors.OKCYAN}{input_value}{Colors.ENDC}")
-        return self.func(input_value)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Executing %s with input: %s", self.func.__name__, preview(input_value), extra={"function_name": self.func.__name__})
+        if self.batched:
+            return self._call_batched([input_value])[0]
+        return self._invoke(input_value)
+
+    def cache_key(self, input_value: Any) -> Optional[str]:
+        """Content address of a call: function identity, code hash and input hash. None if the input can't be hashed stably."""
+        input_hash = _stable_input_hash(input_value)
+        if input_hash is None:
+            return None
+        if self._fingerprint is None:
+            self._fingerprint = _function_fingerprint(self.func)
+        return hashlib.sha256(f"{self._fingerprint}\x00{input_hash}".encode()).hexdigest()
+
+    def _cached_output(self, input_value: Any) -> Tuple[Optional[str], Any]:
+        key = self.cache_key(input_value)
+        output = self.cache.get(key) if key is not None else None
+        if output is not None:
+            logger.info("Cache hit for %s", self.func.__name__)
+            if isinstance(self.cache, InMemoryCache):
+                output = pickle.loads(output)
+        return key, output
+
+    def _store(self, key: Optional[str], output: Any):
+        if key is None:
+            return
+        if isinstance(self.cache, InMemoryCache):
+            # Kept pickled, so a later step mutating the output can't change the cached entry
+            try:
+                output = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.debug("Not caching %s output: %s", self.func.__name__, e)
+                return
+        self.cache.set(key, output)
+
+    def call(self, input_value: Any) -> Tuple[Any, Optional[bool]]:
+        """``execute`` through the node's cache. Returns the output and whether it was a cache hit (None without a cache)."""
+        if self.cache is None:
+            return self.execute(input_value), None
+        key, output = self._cached_output(input_value)
+        if output is not None:
+            return output, True
+        output = self.execute(input_value)
+        self._store(key, output)
+        return output, False
+
+    async def acall(self, input_value: Any, executor: Optional[Executor] = None) -> Tuple[Any, Optional[bool]]:
+        if self.cache is None:
+            return await self.aexecute(input_value, executor), None
+        key, output = self._cached_output(input_value)
+        if output is not None:
+            return output, True
+        output = await self.aexecute(input_value, executor)
+        self._store(key, output)
+        return output, False
+
+    def call_batch(self, input_values: Sequence[Any]) -> Tuple[Sequence[Any], List[Optional[bool]]]:
+        """``execute_batch`` through the node's cache: only the misses are executed."""
+        if self.cache is None:
+            return self.execute_batch(input_values), [None] * len(input_values)
+        looked_up = [self._cached_output(input_value) for input_value in input_values]
+        outputs = [output for _, output in looked_up]
+        misses = [index for index, output in enumerate(outputs) if output is None]
+        if misses:
+            for index, output in zip(misses, self.execute_batch([input_values[index] for index in misses])):
+                outputs[index] = output
+                self._store(looked_up[index][0], output)
+        missed = set(misses)
+        return outputs, [index not in missed for index in range(len(input_values))]
+
+    def execute_batch(self, input_values: Sequence[Any]) -> Sequence[Any]:
+        """Execute a group of inputs: one call for batched functions, one call per input otherwise."""
+        if not self.batched:
+            return [self.execute(input_value) for input_value in input_values]
+        logger.info("Executing batched %s on %s input(s)", self.func.__name__, len(input_values))
+        return self._call_batched(list(input_values))
+
+    async def aexecute(self, input_value: Any, executor: Optional[Executor] = None) -> Any:
+        """Await async functions; offload sync ones to ``executor`` (the loop default if None),
+        or to the process pool for ``executor='process'`` nodes."""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Executing %s with input: %s", self.func.__name__, preview(input_value), extra={"function_name": self.func.__name__})
+        argument = [input_value] if self.batched else input_value
+        if self.is_async:
+            output = await self.func(argument)
+        else:
+            if self.process_pool is not None:
+                executor = self.process_pool()
+            loop = asyncio.get_running_loop()
+            output = await loop.run_in_executor(executor, self.func, argument)
+        if self.batched:
+            return self._check_batch_output(output, 1)[0]
+        return output
 
 class RouterNode(FunctionNode):
     def __init__(
@@ -98,70 +446,751 @@ class RouterNode(FunctionNode):
         func: Callable,
         input_type: type,
         output_type: type,
-        direction_prompt: str,
+        direction_prompt: Optional[str],
         system_prompt: Optional[str] = None,
         openai_api_key: Optional[str] = None,
         model: str = "gpt-4o-mini",
+        clients: Optional[OpenAIClients] = None,
+        routing_cache: Optional[CacheBackend] = None,
+        backend: Optional[RouterBackend] = None,
+        confidence_threshold: Optional[float] = None,
+        speculate: int = 0,
+        input_budget: Optional[int] = None,
+        input_reducer: Union[InputReducer, Callable[[Any], Any], None] = None,
     ):
         super().__init__(func, input_type, output_type)
+        if direction_prompt is None and backend is None:
+            raise ValueError("Router nodes need a 'direction_prompt' to guide the LLM, a routing backend, or both.")
+        if input_budget is not None and input_budget <= 0:
+            raise ValueError("input_budget must be a positive number of tokens.")
+        if isinstance(input_reducer, InputReducer) and input_budget is None:
+            raise ValueError("An InputReducer needs an 'input_budget' to reduce to.")
+        # Local decision-maker tried before the LLM; None routes every input with the LLM
+        self.backend = backend
+        # Backend answers below this confidence escalate to the LLM (None accepts every answer)
+        self.confidence_threshold = confidence_threshold
+        # None disables the LLM: the backend must then decide every input
         self.direction_prompt = direction_prompt
         self.system_prompt = system_prompt or "You are a helpful assistant for function routing."
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
-        if not self.openai_api_key:
-            raise ValueError("OpenAI API key must be provided either via parameter or environment variable 'OPENAI_API_KEY'.")
-        openai.api_key = self.openai_api_key
         self.model = model
+        self.clients = clients
+        if direction_prompt is not None:
+            if not self.openai_api_key and clients is None:
+                raise ValueError("OpenAI API key must be provided either via parameter or environment variable 'OPENAI_API_KEY'.")
+            # Shared, pooled clients; a standalone router gets its own pool
+            self.clients = clients or OpenAIClients(api_key=self.openai_api_key)
+        # Opt-in cache of routing decisions; see '_routing_cache_key' for what invalidates an entry
+        self.routing_cache = routing_cache
+        # Set by the coordinator when metrics are enabled
+        self.metrics: Optional[Metrics] = None
+        # Where decisions are recorded for distillation; None records nothing
+        self.decision_log: Optional[DecisionLog] = None
+        # How many of the likeliest pure branches to start while the decision is pending (0 disables)
+        self.speculate = speculate
+        # Times each function was chosen; ranks the branches to speculate on (a lost update between
+        # concurrent runs only nudges the ranking)
+        self.choice_counts: Counter = Counter()
+        self._choice_lock = threading.Lock()
+        # Static prompt segments per candidate set, built by 'prepare' (see '_prefixes')
+        self._prompt_prefixes: Dict[Tuple['FunctionNode', ...], Tuple[str, str, List[str]]] = {}
+        self._prompt_hash: Optional[str] = None
+        # Prompted inputs are cut to this many tokens (None sends them whole)
+        self.input_budget = input_budget
+        # A plain function projects each input before prompting (e.g. to a title or a few fields);
+        # an InputReducer decides how over-budget text is cut (head and tail by default)
+        if input_reducer is None or isinstance(input_reducer, InputReducer):
+            self.input_projection: Optional[Callable[[Any], Any]] = None
+            self.input_reducer = input_reducer or HeadTailReducer()
+        else:
+            self.input_projection = input_reducer
+            self.input_reducer = HeadTailReducer()
 
-    def decide_path(self, input_value: Any) -> 'FunctionNode':
-        # Construct the full prompt with function descriptions
-        available_functions = ', '.join(
-            [f"{edge.func.__name__}: {edge.description_for_routing or 'No description provided.'}" for edge in self.edges]
-        )
-        full_prompt = (
-            f"{self.direction_prompt}\n"
-            f"Given the input: {input_value}, decide which function to execute next.\n"
-            f"Available functions:\n{available_functions}\n"
-            f"Respond with a JSON object like {{'reasoning_steps': ['step1', 'step2', 'step3'], 'function_name': 'chosen_function'}}."
+    def prepare(self, candidates: Sequence['FunctionNode']):
+        """Build the static prompt segments for ``candidates`` ahead of the first request.
+
+        The coordinator calls this whenever it compiles the graph, which also drops segments built
+        for an older graph.
+        """
+        self._prompt_prefixes = {}
+        self._prompt_hash = None
+        if self.direction_prompt is not None:
+            self._prefixes(tuple(candidates))
+
+    def _prefixes(self, candidates: Tuple['FunctionNode', ...]) -> Tuple[str, str, List[str]]:
+        """The single and batched prompt prefixes (instructions, function catalog and response
+        format) and the cache-key edge set for a candidate set."""
+        prefixes = self._prompt_prefixes.get(candidates)
+        if prefixes is None:
+            available_functions = ', '.join(
+                [f"{edge.func.__name__}: {edge.description_for_routing or 'No description provided.'}" for edge in candidates]
+            )
+            catalog = f"{self.direction_prompt}\nAvailable functions:\n{available_functions}\n"
+            single = (
+                f"{catalog}"
+                f"Respond with a JSON object like {{'reasoning_steps': ['step1', 'step2', 'step3'], 'function_name': 'chosen_function'}}.\n"
+            )
+            batch = (
+                f"{catalog}"
+                f"Respond with a JSON object like {{'choices': [{{'reasoning_steps': ['step1', 'step2'], 'function_name': 'chosen_function'}}, ...]}} "
+                f"containing exactly one choice per item, in item order.\n"
+            )
+            edge_set = sorted(f"{edge.func.__name__}:{edge.description_for_routing or ''}" for edge in candidates)
+            prefixes = self._prompt_prefixes[candidates] = (single, batch, edge_set)
+        return prefixes
+
+    def _routing_cache_key(self, input_value: Any, candidates: Sequence['FunctionNode']) -> Optional[str]:
+        # Prompts, model and the candidate edge set are part of the key, so changing any of them
+        # makes old entries unreachable (they age out through LRU/TTL eviction).
+        if self._prompt_hash is None:
+            self._prompt_hash = hashlib.sha256(
+                "\x00".join([self.model, self.system_prompt, self.direction_prompt]).encode()
+            ).hexdigest()
+        normalized = _normalize_routing_input(input_value)
+        if normalized is None:
+            return None
+        payload = json.dumps(
+            [self.func.__name__, self._prompt_hash, self._prefixes(tuple(candidates))[2], normalized],
+            separators=(",", ":"),
         )
-        logger.debug(f"Router Prompt:\n{self.system_prompt}\n{full_prompt}")
+        return hashlib.sha256(payload.encode()).hexdigest()
 
-        # Log the full prompt
-        logger.info(f"Sending prompt to LLM for routing:\n{Colors.BOLD}System Prompt:{Colors.ENDC}\n {self.system_prompt}\n{Colors.BOLD}User Prompt:{Colors.ENDC}\n {full_prompt}\n")
+    def _cached_choice(self, cache_key: Optional[str], candidates: Sequence['FunctionNode']) -> Optional['FunctionNode']:
+        if cache_key is None:
+            return None
+        cached = self.routing_cache.get(cache_key)
+        choice = None
+        if cached is not None:
+            for edge in candidates:
+                if edge.func.__name__ == cached["function_name"]:
+                    logger.info("Routing cache hit for %s: %s", self.func.__name__, edge.func.__name__)
+                    choice = edge
+                    break
+        if self.metrics is not None:
+            self.metrics.observe_cache(self.func.__name__, choice is not None)
+        return choice
 
-        # Use the OpenAI client beta parse method with Pydantic response_format
-        client = OpenAI()
-        try:
-            completion = client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": full_prompt}
-                ],
-                response_format=FunctionChoice,
-                max_tokens=5000,  # Adjusted tokens to accommodate JSON response
-                n=1,
-                stop=None,
-                temperature=0.0,
+    def _observe_request(self, started: float, completion: Any = None, error: bool = False):
+        if self.metrics is not None:
+            self.metrics.observe_llm(self.func.__name__, time.perf_counter() - started, getattr(completion, "usage", None), error)
+
+    def _prompt_input(self, input_value: Any) -> Any:
+        """The input as it is written into the prompt: projected, then cut to ``input_budget`` tokens."""
+        if self.input_budget is None and self.input_projection is None:
+            return input_value
+        text = str(input_value)
+        original = count_tokens(text, self.model)
+        if self.input_projection is not None:
+            text = str(self.input_projection(input_value))
+        if self.input_budget is not None:
+            text = self.input_reducer.reduce(text, self.input_budget, partial(count_tokens, model=self.model))
+        sent = count_tokens(text, self.model)
+        if sent < original:
+            logger.info("Reduced routing input of %s from %s to %s tokens", self.func.__name__, original, sent)
+        if self.metrics is not None:
+            self.metrics.observe_input(self.func.__name__, sent, max(original - sent, 0))
+        return text
+
+    def _build_messages(self, input_value: Any, candidates: Sequence['FunctionNode']) -> List[Dict[str, str]]:
+        # The static prefix comes first and the input last, so providers can reuse the cached prefix
+        full_prompt = (
+            f"{self._prefixes(tuple(candidates))[0]}"
+            f"Given the input: {self._prompt_input(input_value)}, decide which function to execute next."
+        )
+        # The full prompt at DEBUG, a preview at INFO
+        logger.debug("Router Prompt:\n%s\n%s", self.system_prompt, full_prompt)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Sending prompt to LLM for routing:\nSystem Prompt:\n %s\nUser Prompt:\n %s\n",
+                preview(self.system_prompt), preview(full_prompt), extra={"function_name": self.func.__name__},
             )
-        except Exception as e:
-            logger.error(f"Error during OpenAI API call: {e}")
-            raise
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": full_prompt}
+        ]
 
+    def _completion_kwargs(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            messages=messages,
+            response_format=FunctionChoice,
+            max_tokens=5000,  # Adjusted tokens to accommodate JSON response
+            n=1,
+            stop=None,
+            temperature=0.0,
+        )
+
+    def _resolve_choice(self, completion: Any, candidates: Sequence['FunctionNode'], cache_key: Optional[str] = None) -> 'RoutingDecision':
         choice = completion.choices[0].message.parsed
         # Log the reasoning steps
         reasoning_steps = choice.reasoning_steps
         chosen_function_name = choice.function_name
-        logger.info(f"Router decided to use: {Colors.OKBLUE}{chosen_function_name}{Colors.ENDC} with reasoning steps: {Colors.OKCYAN}{reasoning_steps}{Colors.ENDC}")
+        logger.info("Router decided to use: %s with reasoning steps: %s", chosen_function_name, reasoning_steps)
 
-        for edge in self.edges:
+        for edge in candidates:
             if edge.func.__name__ == chosen_function_name:
-                return edge
+                if cache_key is not None:
+                    self.routing_cache.set(cache_key, choice.model_dump())
+                return RoutingDecision(edge, "llm", reasoning=reasoning_steps)
         raise ValueError(f"No function named '{chosen_function_name}' found among the edges.")
 
+    def _backend_decision(self, decided: Tuple[Optional[str], float, str], candidates: Sequence['FunctionNode']) -> Optional['RoutingDecision']:
+        """Map a backend's answer to a candidate; None means the LLM has to decide."""
+        chosen_function_name, confidence, tier = decided
+        # A missing or non-numeric confidence is never confident, so the cache or the LLM decides
+        confidence = _confidence(confidence)
+        shown = "n/a" if confidence is None else f"{confidence:.2f}"
+        # Read once: 'set_router_backend' may change it concurrently
+        threshold = self.confidence_threshold
+        confident = confidence is not None and (threshold is None or confidence >= threshold)
+        if chosen_function_name is None or (not confident and self.direction_prompt is not None):
+            if self.direction_prompt is None:
+                raise ValueError(f"Routing backend of '{self.func.__name__}' made no decision and the router has no direction_prompt to fall back on.")
+            logger.info("Routing backend of %s deferred (confidence %s); asking the LLM.", self.func.__name__, shown)
+            return None
+        for edge in candidates:
+            if edge.func.__name__ == chosen_function_name:
+                logger.info("Router %s tier %s chose: %s (confidence %s)", self.func.__name__, tier, chosen_function_name, shown)
+                return RoutingDecision(edge, tier, confidence)
+        if self.direction_prompt is None:
+            raise ValueError(f"No function named '{chosen_function_name}' found among the edges.")
+        # e.g. a backend trained before the graph changed
+        logger.warning("Routing backend of %s chose '%s', which is not among its edges; asking the LLM.", self.func.__name__, chosen_function_name)
+        return None
+
+    def _record_decision(self, input_value: Any, decision: 'RoutingDecision', candidates: Sequence['FunctionNode']) -> 'RoutingDecision':
+        if self.metrics is not None:
+            self.metrics.observe_route(self.func.__name__, decision.routed_by)
+        backend = self.backend
+        if backend is not None and decision.routed_by == "llm":
+            backend.observe(input_value, decision.node.func.__name__)
+        if self.speculate:
+            with self._choice_lock:
+                self.choice_counts[decision.node.func.__name__] += 1
+        if self.decision_log is not None:
+            self.decision_log.append(
+                self.func.__name__, input_value, decision.node.func.__name__, decision.routed_by,
+                decision.reasoning, [edge.func.__name__ for edge in candidates],
+            )
+        return decision
+
+    def likely_branches(self, candidates: Sequence['FunctionNode']) -> List['FunctionNode']:
+        """The ``speculate`` pure candidates chosen most often so far; ties keep edge order."""
+        with self._choice_lock:
+            counts = dict(self.choice_counts)
+        pure = sorted((edge for edge in candidates if edge.pure), key=lambda edge: -counts.get(edge.func.__name__, 0))
+        return pure[:self.speculate]
+
+    def route(self, input_value: Any, candidates: Optional[Sequence['FunctionNode']] = None) -> 'RoutingDecision':
+        """Choose the next function: the backend first, then the routing cache, then the LLM."""
+        candidates = self.edges if candidates is None else candidates
+        backend = self.backend
+        if backend is not None:
+            decision = self._backend_decision(backend.decide(input_value, candidates), candidates)
+            if decision is not None:
+                return self._record_decision(input_value, decision, candidates)
+        return self._record_decision(input_value, self._llm_route(input_value, candidates), candidates)
+
+    async def aroute(self, input_value: Any, candidates: Optional[Sequence['FunctionNode']] = None) -> 'RoutingDecision':
+        candidates = self.edges if candidates is None else candidates
+        backend = self.backend
+        if backend is not None:
+            decision = self._backend_decision(await backend.adecide(input_value, candidates), candidates)
+            if decision is not None:
+                return self._record_decision(input_value, decision, candidates)
+        return self._record_decision(input_value, await self._allm_route(input_value, candidates), candidates)
+
+    def decide_path(self, input_value: Any, candidates: Optional[Sequence['FunctionNode']] = None) -> 'FunctionNode':
+        return self.route(input_value, candidates).node
+
+    async def adecide_path(self, input_value: Any, candidates: Optional[Sequence['FunctionNode']] = None) -> 'FunctionNode':
+        return (await self.aroute(input_value, candidates)).node
+
+    def _request(self, kwargs: Dict[str, Any]) -> Any:
+        # Use the OpenAI client beta parse method with Pydantic response_format
+        client = self.clients.sync
+        limiter = getattr(self.clients, "rate_limiter", None)
+        if limiter is None:
+            return client.beta.chat.completions.parse(**kwargs)
+        return limiter.call(partial(client.beta.chat.completions.parse, **kwargs), limiter.estimate(kwargs["messages"], self.model))
+
+    async def _arequest(self, kwargs: Dict[str, Any]) -> Any:
+        client = self.clients.async_
+        limiter = getattr(self.clients, "rate_limiter", None)
+        if limiter is None:
+            return await client.beta.chat.completions.parse(**kwargs)
+        return await limiter.acall(partial(client.beta.chat.completions.parse, **kwargs), limiter.estimate(kwargs["messages"], self.model))
+
+    def _llm_route(self, input_value: Any, candidates: Sequence['FunctionNode']) -> 'RoutingDecision':
+        cache_key = self._routing_cache_key(input_value, candidates) if self.routing_cache is not None else None
+        cached = self._cached_choice(cache_key, candidates)
+        if cached is not None:
+            return RoutingDecision(cached, "cache")
+        messages = self._build_messages(input_value, candidates)
+
+        started = time.perf_counter()
+        try:
+            completion = self._request(self._completion_kwargs(messages))
+        except Exception as e:
+            logger.error("Error during OpenAI API call: %s", e)
+            self._observe_request(started, error=True)
+            raise
+        self._observe_request(started, completion)
+        return self._resolve_choice(completion, candidates, cache_key)
+
+    async def _allm_route(self, input_value: Any, candidates: Sequence['FunctionNode']) -> 'RoutingDecision':
+        cache_key = self._routing_cache_key(input_value, candidates) if self.routing_cache is not None else None
+        cached = self._cached_choice(cache_key, candidates)
+        if cached is not None:
+            return RoutingDecision(cached, "cache")
+        messages = self._build_messages(input_value, candidates)
+
+        started = time.perf_counter()
+        try:
+            completion = await self._arequest(self._completion_kwargs(messages))
+        except Exception as e:
+            logger.error("Error during OpenAI API call: %s", e)
+            self._observe_request(started, error=True)
+            raise
+        self._observe_request(started, completion)
+        return self._resolve_choice(completion, candidates, cache_key)
+
+    def _build_batch_messages(self, input_values: Sequence[Any], candidates: Sequence['FunctionNode']) -> List[Dict[str, str]]:
+        items = '\n'.join(f"Item {index}: {self._prompt_input(value)}" for index, value in enumerate(input_values))
+        full_prompt = (
+            f"{self._prefixes(tuple(candidates))[1]}"
+            f"For each of the following {len(input_values)} inputs, decide which function to execute next.\n"
+            f"{items}"
+        )
+        logger.info("Sending batched prompt to LLM for routing %s input(s) through %s", len(input_values), self.func.__name__)
+        logger.debug("Router Prompt:\n%s\n%s", self.system_prompt, full_prompt)
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": full_prompt}
+        ]
+
+    def _decide_batch(self, input_values: Sequence[Any], candidates: Sequence['FunctionNode'], cache_keys: Sequence[Optional[str]]) -> List['RoutingDecision']:
+        kwargs = self._completion_kwargs(self._build_batch_messages(input_values, candidates))
+        kwargs["response_format"] = BatchFunctionChoice
+        started = time.perf_counter()
+        try:
+            completion = self._request(kwargs)
+        except Exception as e:
+            logger.error("Error during OpenAI API call: %s", e)
+            self._observe_request(started, error=True)
+            raise
+        self._observe_request(started, completion)
+
+        by_name = {edge.func.__name__: edge for edge in candidates}
+        parsed = completion.choices[0].message.parsed
+        if parsed is None or len(parsed.choices) != len(input_values):
+            raise ValueError(f"Expected {len(input_values)} routing choices, got {0 if parsed is None else len(parsed.choices)}.")
+        decisions = []
+        for choice in parsed.choices:
+            if choice.function_name not in by_name:
+                raise ValueError(f"No function named '{choice.function_name}' found among the edges.")
+            decisions.append(RoutingDecision(by_name[choice.function_name], "llm", reasoning=choice.reasoning_steps))
+        for choice, cache_key in zip(parsed.choices, cache_keys):
+            if cache_key is not None:
+                self.routing_cache.set(cache_key, choice.model_dump())
+        logger.info("Router %s routed %s input(s) in one request", self.func.__name__, len(decisions))
+        return decisions
+
+    def route_many(
+        self,
+        input_values: Sequence[Any],
+        candidates: Optional[Sequence['FunctionNode']] = None,
+        max_batch_size: int = 20,
+    ) -> List['RoutingDecision']:
+        """Route many inputs with one structured-output request per ``max_batch_size`` chunk.
+
+        The routing backend and cached decisions are served first. If a batched response can't be
+        parsed or doesn't line up with the inputs, that chunk falls back to one request per input.
+        """
+        candidates = self.edges if candidates is None else candidates
+        decisions: List[Optional[RoutingDecision]] = [None] * len(input_values)
+        cache_keys: List[Optional[str]] = [None] * len(input_values)
+        misses = []
+        backend = self.backend
+        for index, input_value in enumerate(input_values):
+            if backend is not None:
+                decisions[index] = self._backend_decision(backend.decide(input_value, candidates), candidates)
+                if decisions[index] is not None:
+                    continue
+            if self.routing_cache is not None:
+                cache_keys[index] = self._routing_cache_key(input_value, candidates)
+                cached = self._cached_choice(cache_keys[index], candidates)
+                if cached is not None:
+                    decisions[index] = RoutingDecision(cached, "cache")
+            if decisions[index] is None:
+                misses.append(index)
+
+        for start in range(0, len(misses), max_batch_size):
+            chunk = misses[start:start + max_batch_size]
+            if len(chunk) == 1:
+                decisions[chunk[0]] = self._llm_route(input_values[chunk[0]], candidates)
+                continue
+            try:
+                chunk_decisions = self._decide_batch(
+                    [input_values[index] for index in chunk], candidates, [cache_keys[index] for index in chunk]
+                )
+            except (ValidationError, ValueError, openai.LengthFinishReasonError) as e:
+                logger.warning("Batched routing failed (%s); falling back to per-item routing for %s input(s).", e, len(chunk))
+                chunk_decisions = [self._llm_route(input_values[index], candidates) for index in chunk]
+            for index, decision in zip(chunk, chunk_decisions):
+                decisions[index] = decision
+        return [self._record_decision(input_value, decision, candidates) for input_value, decision in zip(input_values, decisions)]
+
+    def decide_paths(
+        self,
+        input_values: Sequence[Any],
+        candidates: Optional[Sequence['FunctionNode']] = None,
+        max_batch_size: int = 20,
+    ) -> List['FunctionNode']:
+        """``route_many`` without the decision details."""
+        return [decision.node for decision in self.route_many(input_values, candidates, max_batch_size)]
+
     def execute(self, input_value: Any) -> Any:
-        logger.info(f"Router {Colors.OKBLUE}{self.func.__name__}{Colors.ENDC} called. Deciding next action.")
+        logger.info("Router %s called. Deciding next action.", self.func.__name__)
         return input_value  # Pass the input through unchanged
 
+    async def aexecute(self, input_value: Any, executor: Optional[Executor] = None) -> Any:
+        return self.execute(input_value)
+
+def _warm_worker(modules: Sequence[str]):
+    """Process pool initializer: import the modules defining process-pool functions once per worker."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning("Worker could not import module '%s': %s", module, e)
+
+class JoinNode(FunctionNode):
+    """Merges the outputs of parallel branches into one value.
+
+    The function receives a dict of branch outputs keyed by the name of each branch's first function,
+    in fan-out edge order, or a tuple in that order when ``input_type`` is a tuple type.
+    """
+
+    def branch_types(self) -> Optional[Tuple[Any, ...]]:
+        """Types a branch may deliver, or None when the join accepts anything."""
+        origin = get_origin(self.input_type) or self.input_type
+        args = tuple(arg for arg in get_args(self.input_type) if arg is not Ellipsis)
+        if origin is dict and len(args) == 2:
+            return (args[1],)
+        if origin is tuple and args:
+            return args
+        return None
+
+    def positional_types(self) -> Optional[Tuple[Any, ...]]:
+        """The type expected from each branch, in fan-out edge order, for a fixed-length tuple join."""
+        args = get_args(self.input_type)
+        if (get_origin(self.input_type) or self.input_type) is tuple and args and Ellipsis not in args:
+            return args
+        return None
+
+    def expectation(self) -> str:
+        """What the join expects from its branches, for error messages."""
+        positions = self.positional_types()
+        if positions is not None:
+            return "branch outputs by position (" + ", ".join(f"{index}: {_type_name(t)}" for index, t in enumerate(positions)) + ")"
+        return f"branch outputs of type {' | '.join(_type_name(t) for t in self.branch_types())}"
+
+    def join_input(self, branches: Sequence[FunctionNode], outputs: Sequence[Any]) -> Any:
+        origin = get_origin(self.input_type) or self.input_type
+        if origin is tuple:
+            return tuple(outputs)
+        return {branch.func.__name__: output for branch, output in zip(branches, outputs)}
+
+def _type_name(t: Any) -> str:
+    return getattr(t, "__name__", repr(t))
+
+def _check_edge_types(source: FunctionNode, target: FunctionNode):
+    if isinstance(target, JoinNode):
+        allowed = target.branch_types()
+        if allowed is not None and Any not in allowed and source.output_type not in allowed:
+            # The branch's position is only known once the graph is compiled; ExecutionPlan checks it
+            raise TypeError(
+                f"Type mismatch: {_type_name(source.output_type)} -> join '{target.func.__name__}' "
+                f"expecting {target.expectation()}"
+            )
+    elif source.output_type != target.input_type:
+        raise TypeError(f"Type mismatch: {_type_name(source.output_type)} -> {_type_name(target.input_type)}")
+
+def _map_concurrently(executor: Executor, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+    """Map ``fn`` over ``items`` on ``executor``, in order.
+
+    The first item runs in the calling thread, and any item whose task hasn't started by the time
+    its result is needed is pulled back and run inline, so nested fan-outs can't deadlock the pool.
+    """
+    futures = [executor.submit(fn, item) for item in items[1:]]
+    try:
+        results = [fn(items[0])]
+        for item, future in zip(items[1:], futures):
+            results.append(fn(item) if future.cancel() else future.result())
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return results
+
+def _timed_call(node: FunctionNode, input_value: Any) -> Tuple[Any, Optional[bool], float]:
+    started = time.perf_counter()
+    output, cached = node.call(input_value)
+    return output, cached, time.perf_counter() - started
+
+def _discard_result(future: Any):
+    # Retrieve the exception of a discarded speculative run so it isn't reported as unhandled
+    if not future.cancelled():
+        future.exception()
+
+class FanOut(NamedTuple):
+    branches: Tuple[FunctionNode, ...]
+    join: JoinNode
+
+class _Handoff(Exception):
+    """Raised when a worker's run reaches a node of another pool."""
+
+    def __init__(self, node: 'FunctionNode', input_value: Any):
+        super().__init__(node.func.__name__)
+        self.node = node
+        self.input_value = input_value
+
+class _StreamClosed(RuntimeError):
+    """Raised in a streamed run once the consumer has closed the stream."""
+
+
+class _RunContext:
+    """Per-run state: the plan being walked, the trace mode, recorded steps and the callback state."""
+
+    __slots__ = ("plan", "trace", "steps", "system_state", "sink", "metrics", "run_id", "checkpoints", "position", "saved_steps", "pools")
+
+    def __init__(
+        self,
+        plan: 'ExecutionPlan',
+        trace: str,
+        initial_input: Any,
+        sink: Optional[Callable[[StepEvent], None]] = None,
+        metrics: Optional[Metrics] = None,
+        run_id: Optional[str] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        pools: Optional[FrozenSet[str]] = None,
+    ):
+        if trace not in (TraceMode.NONE, TraceMode.SUMMARY, TraceMode.FULL):
+            raise ValueError(f"Invalid trace mode: {trace}. Use 'none', 'summary' or 'full'.")
+        self.plan = plan
+        self.trace = trace
+        # Receives step events while streaming; None for plain runs
+        self.sink = sink
+        self.metrics = metrics
+        # Durable progress of the main path; None for runs without a checkpoint store
+        self.run_id = run_id
+        self.checkpoints = checkpoints
+        # The node about to run and its input, as last checkpointed
+        self.position: Tuple[Optional[str], Any] = (None, initial_input)
+        # Steps already in the store; None until the run's first save, which replaces any old run
+        self.saved_steps: Optional[int] = None
+        # Pools of the worker executing this run, which stops at a node of any other pool;
+        # None for in-process runs
+        self.pools = pools
+        self.steps: List[_StepRecord] = []
+        self.system_state = {
+            "current_node": None,
+            "input_value": initial_input,
+            "output_value": None,
+            "steps": self.steps
+        }
+
+    def record(
+        self,
+        function_name: str,
+        input_value: Any,
+        output_value: Any,
+        duration: float,
+        decision: Optional[RoutingDecision] = None,
+        cached: Optional[bool] = None,
+    ):
+        if self.metrics is not None:
+            self.metrics.observe_node(function_name, duration, cached=cached)
+        if self.trace != TraceMode.NONE:
+            if self.trace == TraceMode.FULL and (input_value is None or output_value is None):
+                # Steps are built lazily; raise their validation error here, at the failing step
+                FunctionStep(function_name=function_name, input_value=input_value, output_value=output_value)
+            if decision is None:
+                self.steps.append(_StepRecord(function_name, input_value, output_value, duration, self.trace, cached=bool(cached)))
+            else:
+                self.steps.append(_StepRecord(function_name, input_value, output_value, duration, self.trace, decision.routed_by, decision.confidence))
+
+    def record_error(self, function_name: str, duration: float):
+        if self.metrics is not None:
+            self.metrics.observe_node(function_name, duration, error=True)
+
+    def emit(self, event_type: str, **fields):
+        if self.sink is not None:
+            self.sink(StepEvent(type=event_type, **fields))
+
+    def _save(self, node: Optional[str], value: Any, status: str, error: Optional[str] = None):
+        try:
+            if self.saved_steps is None:
+                self.checkpoints.save(Checkpoint(self.run_id, node, value, list(self.steps), self.trace, status, error, time.time()))
+            else:
+                # Only the new steps, so a checkpoint costs the same at every step of a long chain
+                self.checkpoints.append(Checkpoint(self.run_id, node, value, self.steps[self.saved_steps:], self.trace, status, error, time.time()))
+            self.saved_steps = len(self.steps)
+        except Exception as e:
+            # Checkpointing is best effort: a payload that can't be stored must not fail the run
+            logger.warning("Could not checkpoint run %s at %s: %s", self.run_id, node, e)
+
+    def checkpoint(self, node: FunctionNode, input_value: Any):
+        self.position = (node.func.__name__, input_value)
+        self._save(node.func.__name__, input_value, CheckpointStatus.RUNNING)
+
+    def fail(self, error: BaseException):
+        node, input_value = self.position
+        self._save(node, input_value, CheckpointStatus.FAILED, f"{type(error).__name__}: {error}")
+        logger.error("Run %s failed at %s; continue it with Coordinator.resume(%r).", self.run_id, node, self.run_id)
+
+    def abandon(self):
+        """The caller stopped consuming the run; its last checkpoint stays as it was."""
+        logger.info("Run %s abandoned at %s; continue it with Coordinator.resume(%r).", self.run_id, self.position[0], self.run_id)
+
+    def complete(self, final_output: Any):
+        if self.checkpoints.keep_completed:
+            self._save(None, final_output, CheckpointStatus.COMPLETED)
+        else:
+            self.checkpoints.delete(self.run_id)
+
+    def branch(self, input_value: Any) -> '_RunContext':
+        """Context for one parallel branch: own steps, a copy of the callback state."""
+        child = _RunContext(self.plan, self.trace, input_value, self.sink, self.metrics)
+        child.system_state.update(self.system_state, steps=child.steps)
+        return child
+
+    def response(self, final_output: Any) -> FunctionResponse:
+        return FunctionResponse(final_output=final_output, trace=self.trace, run_id=self.run_id, records=self.steps)
+
+class _BatchItem:
+    """Progress of one input through 'Coordinator.run_batch'."""
+
+    __slots__ = ("node", "input_value", "output", "ctx")
+
+    def __init__(self, node: FunctionNode, input_value: Any, ctx: _RunContext):
+        self.node: Optional[FunctionNode] = node
+        self.input_value = input_value
+        self.output = None
+        self.ctx = ctx
+
+class ExecutionPlan:
+    """Immutable, validated snapshot of a coordinator graph.
+
+    Built once by ``Coordinator.compile()``; ``Coordinator.run`` walks it without
+    any per-call graph analysis.
+    """
+
+    __slots__ = ("entry", "nodes", "successors", "fanouts")
+
+    def __init__(self, functions: Dict[str, FunctionNode]):
+        nodes = dict(functions)
+        successors = {name: tuple(node.edges) for name, node in nodes.items()}
+        parallel = {name: tuple(node.parallel_edges) for name, node in nodes.items()}
+
+        # Any node that is nobody's successor is an entry point
+        targets = {id(target) for edges in (*successors.values(), *parallel.values()) for target in edges}
+        starting_functions = [node for node in nodes.values() if id(node) not in targets]
+        if not starting_functions:
+            raise ValueError("No starting function found. There might be a cycle or no entry point.")
+        if len(starting_functions) > 1:
+            raise ValueError("Multiple starting functions found. Please ensure there is only one entry point.")
+
+        for name, node in nodes.items():
+            if parallel[name]:
+                if isinstance(node, RouterNode):
+                    raise ValueError(f"Router '{name}' cannot have parallel edges.")
+                if successors[name]:
+                    raise ValueError(f"Function '{name}' mixes parallel and sequential outgoing edges.")
+            elif isinstance(node, RouterNode):
+                if not successors[name]:
+                    raise ValueError(f"Router '{name}' has no outgoing edges to choose from.")
+            elif len(successors[name]) > 1:
+                raise ValueError(f"Function '{name}' has multiple outgoing edges. Use a router node to handle branching.")
+
+        fanouts: Dict[str, FanOut] = {}
+        for name in nodes:
+            if parallel[name]:
+                self._resolve_fanout(name, successors, parallel, fanouts)
+        joins = {id(fanout.join) for fanout in fanouts.values()}
+        for name, node in nodes.items():
+            if isinstance(node, JoinNode) and id(node) not in joins:
+                raise ValueError(f"Join '{name}' is not the join point of any parallel fan-out.")
+
+        object.__setattr__(self, "entry", starting_functions[0])
+        object.__setattr__(self, "nodes", MappingProxyType(nodes))
+        object.__setattr__(self, "successors", MappingProxyType(successors))
+        object.__setattr__(self, "fanouts", MappingProxyType(fanouts))
+
+    @classmethod
+    def _resolve_fanout(cls, name: str, successors, parallel, fanouts: Dict[str, FanOut]) -> JoinNode:
+        """Find the single join node that every path out of ``name``'s parallel branches reaches first."""
+        if name in fanouts:
+            return fanouts[name].join
+        joins: Dict[int, JoinNode] = {}
+        # Output types each branch delivers to the join, in fan-out edge order
+        delivered: List[List[Any]] = []
+        for head in parallel[name]:
+            stack, visited, types = [(head, None)], set(), []
+            delivered.append(types)
+            while stack:
+                node, previous = stack.pop()
+                if isinstance(node, JoinNode):
+                    joins[id(node)] = node
+                    types.append(previous.output_type)
+                    continue
+                if id(node) in visited:
+                    continue
+                visited.add(id(node))
+                node_name = node.func.__name__
+                if parallel[node_name]:
+                    # Nested fan-out: continue after its own join
+                    inner_join = cls._resolve_fanout(node_name, successors, parallel, fanouts)
+                    stack.extend((target, inner_join) for target in successors[inner_join.func.__name__])
+                elif successors[node_name]:
+                    stack.extend((target, node) for target in successors[node_name])
+                else:
+                    raise ValueError(f"Parallel branch from '{name}' ends at '{node_name}' without reaching a join node.")
+        if len(joins) != 1:
+            raise ValueError(f"Parallel branches from '{name}' must all converge on exactly one join node, found {len(joins)}.")
+        join = next(iter(joins.values()))
+        cls._check_positions(name, join, delivered)
+        fanouts[name] = FanOut(parallel[name], join)
+        return join
+
+    @staticmethod
+    def _check_positions(name: str, join: JoinNode, delivered: List[List[Any]]):
+        """A fixed-length tuple join types each branch by its position in the fan-out."""
+        positions = join.positional_types()
+        if positions is None:
+            return
+        join_name = join.func.__name__
+        if len(positions) != len(delivered):
+            raise TypeError(
+                f"Join '{join_name}' expects {len(positions)} branches, "
+                f"but '{name}' fans out to {len(delivered)}: expecting {join.expectation()}"
+            )
+        for index, (expected, types) in enumerate(zip(positions, delivered)):
+            for output_type in types:
+                if expected is not Any and output_type != expected:
+                    raise TypeError(
+                        f"Type mismatch: branch {index} from '{name}' delivers {_type_name(output_type)} "
+                        f"-> join '{join_name}' expecting {join.expectation()}"
+                    )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ExecutionPlan is immutable.")
+
+    def next_node(self, node: FunctionNode) -> Optional[FunctionNode]:
+        edges = self.successors[node.func.__name__]
+        return edges[0] if edges else None
+
 # Define Callback Points as Constants
 class CallbackPoints:
     INITIALIZATION = "initialization"
@@ -170,20 +1199,63 @@ class CallbackPoints:
     AFTER_NODE_EXECUTION = "after_node_execution"
 
 class Coordinator:
-    def __init__(self, openai_api_key: Optional[str] = None, system_prompt: Optional[str] = None):
+    """Builds a function graph and runs chains over it.
+
+    One coordinator may serve many threads and event loops at once. Graph changes take an internal
+    lock and invalidate the compiled ``ExecutionPlan``; every run walks an immutable plan and keeps
+    its steps and callback state in its own ``_RunContext``, so concurrent runs never share mutable
+    state beyond thread-safe clients, caches and metrics.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        clients: Optional[OpenAIClients] = None,
+        routing_cache: Optional[CacheBackend] = None,
+        branch_executor: Optional[Executor] = None,
+        process_pool_size: Optional[int] = None,
+        metrics: Union[bool, Metrics] = False,
+        decision_log: Optional[Union[str, DecisionLog]] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        job_queue: Optional[JobQueue] = None,
+    ):
         self.functions: Dict[str, FunctionNode] = {}
+        self._plan: Optional[ExecutionPlan] = None
         self.callbacks: Dict[str, List[Callback]] = {
             CallbackPoints.INITIALIZATION: [],
             CallbackPoints.LOOP_START: [],
             CallbackPoints.INNER_LOOP_START: [],
             CallbackPoints.AFTER_NODE_EXECUTION: []
         }
+        # Only LLM routing needs a key; chains with local routing backends run offline
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
-        if not self.openai_api_key:
-            raise ValueError("OpenAI API key must be provided either via parameter or environment variable 'OPENAI_API_KEY'.")
         self.system_prompt = system_prompt or "You are ChatGPT, a helpful assistant."
-        openai.api_key = self.openai_api_key
-        logger.info(f"{Colors.OKGREEN}Coordinator initialized.{Colors.ENDC}")
+        # Executor used by 'arun' for sync functions and callbacks; None means the event loop default
+        self.executor = executor
+        # One pooled client set shared by every router (None without an API key); configure pool size,
+        # keep-alive and timeouts here
+        self.clients = clients or (OpenAIClients(api_key=self.openai_api_key) if self.openai_api_key else None)
+        # Default routing cache for routers that don't bring their own (None disables caching)
+        self.routing_cache = routing_cache
+        # Thread pool for parallel branches in 'run'; created on first use when not provided
+        self.branch_executor = branch_executor
+        self._owns_branch_executor = branch_executor is None
+        # Worker processes for executor='process' functions; None sizes the pool to the CPU count
+        self.process_pool_size = process_pool_size
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        # Per-node and per-router instrumentation; None (the default) skips it entirely
+        self._metrics: Optional[Metrics] = Metrics() if metrics is True else (metrics or None)
+        # Routing decisions are appended here for distillation (a path opens a JSON-lines log)
+        self.decision_log: Optional[DecisionLog] = DecisionLog(decision_log) if isinstance(decision_log, str) else decision_log
+        # Saves each run's progress before every node so failed runs can be resumed; None disables it
+        self.checkpoint_store = checkpoint_store
+        # Where 'submit' queues runs for 'coordinator-worker' processes; None disables worker mode
+        self.job_queue = job_queue
+        # Serializes graph changes and lazy set-up; runs never take it once the plan is compiled
+        self._lock = threading.RLock()
+        logger.info("Coordinator initialized.")
 
     def register_function(
         self,
@@ -194,133 +1266,891 @@ class Coordinator:
         direction_prompt: Optional[str] = None,
         router_system_prompt: Optional[str] = None,
         description_for_routing: Optional[str] = None,
+        routing_cache: Optional[CacheBackend] = None,
+        batched: bool = False,
+        is_join: bool = False,
+        executor: Optional[str] = None,
+        router_backend: Optional[RouterBackend] = None,
+        confidence_threshold: Optional[float] = None,
+        pure: bool = False,
+        speculate: int = 0,
+        cache: Optional[CacheBackend] = None,
+        input_budget: Optional[int] = None,
+        input_reducer: Union[InputReducer, Callable[[Any], Any], None] = None,
+        pool: Optional[str] = None,
     ) -> Callable:
+        if is_router and is_join:
+            raise ValueError("A function cannot be both a router and a join node.")
         if is_router:
-            if not direction_prompt:
-                raise ValueError("Router nodes must have a 'direction_prompt' to guide the LLM.")
+            if not direction_prompt and router_backend is None:
+                raise ValueError("Router nodes must have a 'direction_prompt' to guide the LLM, or a 'router_backend'.")
+            if batched:
+                raise ValueError("Router nodes cannot be batched; use 'run_batch' to route many inputs at once.")
+            if executor is not None:
+                raise ValueError("Router nodes always run in-process.")
+            if pure:
+                raise ValueError("'pure' marks functions a router may run speculatively; it does not apply to routers.")
+            if cache is not None:
+                raise ValueError("Router decisions are cached with 'routing_cache', not 'cache'.")
             node = RouterNode(
                 func,
                 input_type,
                 output_type,
-                direction_prompt,
+                direction_prompt or None,
                 router_system_prompt,
-                self.openai_api_key
+                self.openai_api_key,
+                clients=self.clients,
+                routing_cache=routing_cache or self.routing_cache,
+                backend=router_backend,
+                confidence_threshold=confidence_threshold,
+                speculate=speculate,
+                input_budget=input_budget,
+                input_reducer=input_reducer,
             )
-            logger.info(f"Registered {Colors.OKBLUE}router function{Colors.ENDC}: {func.__name__} with input type {input_type.__name__} and output type {output_type.__name__}")
+            node.metrics = self._metrics
+            node.decision_log = self.decision_log
+            logger.info("Registered router function: %s with input type %s and output type %s", func.__name__, _type_name(input_type), _type_name(output_type))
         else:
-            node = FunctionNode(
+            if router_backend is not None or confidence_threshold is not None or speculate or input_budget is not None or input_reducer is not None:
+                raise ValueError("'router_backend', 'confidence_threshold', 'speculate', 'input_budget' and 'input_reducer' only apply to router nodes.")
+            node_class = JoinNode if is_join else FunctionNode
+            node = node_class(
                 func,
                 input_type,
                 output_type,
-                description_for_routing
+                description_for_routing,
+                batched=batched,
+                executor=executor,
+                pure=pure,
+                cache=cache,
             )
-            logger.info(f"Registered {Colors.OKBLUE}function{Colors.ENDC}: {func.__name__} with input type {input_type.__name__} and output type {output_type.__name__}")
-        self.functions[func.__name__] = node
+            if executor == "process":
+                node.process_pool = self._get_process_pool
+            kind = "join function" if is_join else "function"
+            logger.info("Registered %s: %s with input type %s and output type %s", kind, func.__name__, _type_name(input_type), _type_name(output_type))
+        node.pool = pool or DEFAULT_POOL
+        with self._lock:
+            self.functions[func.__name__] = node
+            self._plan = None
         return func
 
-    def create_edge(self, source_func: Callable, target_func: Callable):
+    def set_router_backend(self, router_func: Callable, backend: Optional[RouterBackend], confidence_threshold: Optional[float] = None):
+        """Install (or, with None, remove) the routing backend of a registered router, e.g. a model
+        trained with ``distill.train``. Answers below ``confidence_threshold`` go to the LLM."""
+        node = self.functions.get(router_func.__name__)
+        if not isinstance(node, RouterNode):
+            raise ValueError(f"'{router_func.__name__}' is not a registered router.")
+        if backend is None and node.direction_prompt is None:
+            raise ValueError(f"Router '{router_func.__name__}' has no direction_prompt, so it needs a routing backend.")
+        with self._lock:
+            node.backend = backend
+            node.confidence_threshold = confidence_threshold
+        logger.info("Set routing backend of %s to %s", router_func.__name__, backend.tier if backend is not None else None)
+
+    def create_edge(self, source_func: Callable, target_func: Callable, parallel: bool = False):
+        """Connect two functions. Parallel edges fan out concurrently and must converge on a join node."""
         source_node = self.functions.get(source_func.__name__)
         target_node = self.functions.get(target_func.__name__)
         if not source_node or not target_node:
             raise ValueError("Both source and target functions must be registered before creating an edge.")
-        if source_node.output_type != target_node.input_type:
-            raise TypeError(f"Type mismatch: {source_node.output_type.__name__} -> {target_node.input_type.__name__}")
-        source_node.edges.append(target_node)
-        logger.info(f"Created edge from '{Colors.OKBLUE}{source_func.__name__}{Colors.ENDC}' to '{Colors.OKBLUE}{target_func.__name__}{Colors.ENDC}'")
+        _check_edge_types(source_node, target_node)
+        with self._lock:
+            # Copy-on-write, so a plan being compiled never sees a half-updated edge list
+            if parallel:
+                source_node.parallel_edges = source_node.parallel_edges + [target_node]
+            else:
+                source_node.edges = source_node.edges + [target_node]
+            self._plan = None
+        kind = "parallel edge" if parallel else "edge"
+        logger.info("Created %s from '%s' to '%s'", kind, source_func.__name__, target_func.__name__)
+
+    @contextlib.contextmanager
+    def graph_changes(self) -> Iterator['Coordinator']:
+        """Group graph changes made while runs are in flight.
+
+        A graph is usually invalid half way through a change, e.g. a new function has no incoming
+        edge yet. Runs that need a new plan wait until the block exits instead of compiling one.
+        """
+        with self._lock:
+            yield self
+
+    def close(self):
+        """Deliver pending deferred callbacks, then release the pooled HTTP connections and worker pools."""
+        for callback in self._deferred_callbacks():
+            callback.close()
+        if self.clients is not None:
+            self.clients.close()
+        if self.decision_log is not None:
+            self.decision_log.close()
+        if self._owns_branch_executor and self.branch_executor is not None:
+            self.branch_executor.shutdown(wait=True)
+            self.branch_executor = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+            self._process_pool = None
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is not None:
+            return self._process_pool
+        with self._lock:
+            if self._process_pool is not None:
+                return self._process_pool
+            modules = sorted({
+                node.func.__module__ for node in self.functions.values()
+                if node.executor == "process" and node.func.__module__ != "__main__"
+            })
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_pool_size,
+                initializer=_warm_worker,
+                initargs=(modules,),
+            )
+            logger.info("Started process pool with %s worker(s)", self._process_pool._max_workers)
+        return self._process_pool
+
+    def _get_branch_executor(self) -> Executor:
+        if self.branch_executor is None:
+            with self._lock:
+                if self.branch_executor is None:
+                    self.branch_executor = ThreadPoolExecutor(thread_name_prefix="fcc-branch")
+        return self.branch_executor
 
-    def add_callback(self, callback_point: str, callback: Callback):
+    def add_callback(
+        self,
+        callback_point: str,
+        callback: Callback,
+        deferred: bool = False,
+        max_queue_size: int = 1000,
+        overflow: str = OverflowPolicy.DROP,
+        batch_size: Optional[int] = None,
+    ):
+        """Register a callback. With ``deferred=True`` it runs on a background thread fed by a
+        bounded queue instead of inline, so slow sinks do not add latency to the chain."""
         if callback_point not in self.callbacks:
             raise ValueError(f"Invalid callback point: {callback_point}.")
-        self.callbacks[callback_point].append(callback)
-        logger.info(f"Added callback to '{callback_point}' point.")
+        if deferred:
+            callback = DeferredCallback(callback, max_queue_size=max_queue_size, overflow=overflow, batch_size=batch_size)
+        with self._lock:
+            # Copy-on-write: runs iterate the list they started with
+            self.callbacks[callback_point] = self.callbacks[callback_point] + [callback]
+        logger.info("Added %scallback to '%s' point.", "deferred " if deferred else "", callback_point)
 
-    def run(self, initial_input: Any) -> FunctionResponse:
-        system_state = {
-            "current_node": None,
-            "input_value": initial_input,
-            "output_value": None,
-            "steps": []
-        }
+    def _deferred_callbacks(self) -> List[DeferredCallback]:
+        return [
+            callback for callbacks in self.callbacks.values() for callback in callbacks
+            if isinstance(callback, DeferredCallback)
+        ]
 
-        # Trigger Initialization Callbacks
-        self._trigger_callbacks(CallbackPoints.INITIALIZATION, system_state)
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every deferred callback to drain its queue. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for callback in self._deferred_callbacks():
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            if not callback.flush(remaining):
+                return False
+        return True
 
-        # Identify the starting function(s)
-        starting_functions = [fn for fn in self.functions.values() if not any(fn in node.edges for node in self.functions.values())]
-        if not starting_functions:
-            raise ValueError("No starting function found. There might be a cycle or no entry point.")
-        if len(starting_functions) > 1:
-            raise ValueError("Multiple starting functions found. Please ensure there is only one entry point.")
-        current_node = starting_functions[0]
-        input_value = initial_input
-        steps = []
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of node and router metrics, plus the stats of every function and routing cache in use
+        and of the clients' rate limiter.
 
-        # Trigger Loop Start Callbacks
-        self._trigger_callbacks(CallbackPoints.LOOP_START, system_state)
+        Requires the coordinator to be created with ``metrics=True`` (or a ``Metrics`` instance).
+        """
+        if self._metrics is None:
+            raise RuntimeError("Metrics are disabled; create the Coordinator with metrics=True.")
+        snapshot = self._metrics.snapshot()
+        snapshot["caches"] = {}
+        with self._lock:
+            functions = list(self.functions.items())
+        for name, node in functions:
+            cache = node.routing_cache if isinstance(node, RouterNode) else node.cache
+            if cache is not None:
+                snapshot["caches"][name] = cache.stats.as_dict()
+        rate_limiter = getattr(self.clients, "rate_limiter", None)
+        if rate_limiter is not None:
+            snapshot["rate_limiter"] = rate_limiter.stats()
+        return snapshot
+
+    def prometheus_metrics(self, prefix: str = "fcc") -> str:
+        """The ``metrics()`` snapshot in the Prometheus text exposition format."""
+        return render_prometheus(self.metrics(), prefix)
+
+    def _context(
+        self,
+        trace: str,
+        initial_input: Any,
+        sink: Optional[Callable[[StepEvent], None]] = None,
+        run_id: Optional[str] = None,
+    ) -> _RunContext:
+        if self.checkpoint_store is None:
+            return _RunContext(self.compile(), trace, initial_input, sink, self._metrics)
+        return _RunContext(self.compile(), trace, initial_input, sink, self._metrics, run_id or uuid.uuid4().hex, self.checkpoint_store)
+
+    def _resume_context(self, run_id: str) -> Tuple[_RunContext, Checkpoint]:
+        if self.checkpoint_store is None:
+            raise RuntimeError("Checkpointing is disabled; create the Coordinator with a checkpoint_store.")
+        checkpoint = self.checkpoint_store.load(run_id)
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint found for run '{run_id}'.")
+        ctx = self._context(checkpoint.trace, checkpoint.input_value, run_id=run_id)
+        ctx.steps.extend(checkpoint.steps)
+        ctx.saved_steps = len(checkpoint.steps)
+        if checkpoint.status != CheckpointStatus.COMPLETED and checkpoint.node not in ctx.plan.nodes:
+            raise ValueError(f"Run '{run_id}' stopped at '{checkpoint.node}', which is no longer in the graph.")
+        logger.info("Resuming run %s at %s", run_id, checkpoint.node)
+        return ctx, checkpoint
+
+    def resume(self, run_id: str) -> FunctionResponse:
+        """Continue a checkpointed run from the node it was about to execute when it stopped.
+
+        Steps recorded before the checkpoint are kept; completed steps are not executed again.
+        """
+        ctx, checkpoint = self._resume_context(run_id)
+        if checkpoint.status == CheckpointStatus.COMPLETED:
+            return ctx.response(checkpoint.input_value)
+        return self._execute(ctx, checkpoint.input_value, ctx.plan.nodes[checkpoint.node])
+
+    async def aresume(self, run_id: str) -> FunctionResponse:
+        """Asynchronous counterpart of ``resume``."""
+        ctx, checkpoint = self._resume_context(run_id)
+        if checkpoint.status == CheckpointStatus.COMPLETED:
+            return ctx.response(checkpoint.input_value)
+        return await self._aexecute(ctx, checkpoint.input_value, ctx.plan.nodes[checkpoint.node])
+
+    def _require_job_queue(self) -> JobQueue:
+        if self.job_queue is None:
+            raise RuntimeError("Worker mode is disabled; create the Coordinator with a job_queue.")
+        return self.job_queue
+
+    def submit(self, initial_input: Any, trace: str = TraceMode.FULL, run_id: Optional[str] = None) -> str:
+        """Queue a run for ``coordinator-worker`` processes and return its run id (a random id by default).
+
+        Collect the response with ``result``.
+        """
+        job_queue = self._require_job_queue()
+        if trace not in (TraceMode.NONE, TraceMode.SUMMARY, TraceMode.FULL):
+            raise ValueError(f"Invalid trace mode: {trace}. Use 'none', 'summary' or 'full'.")
+        entry = self.compile().entry
+        run_id = run_id or uuid.uuid4().hex
+        job_queue.put(Job(run_id, entry.func.__name__, initial_input, [], trace, entry.pool))
+        logger.info("Submitted run %s to pool '%s'", run_id, entry.pool)
+        return run_id
+
+    def _job_response(self, run_id: str) -> Optional[FunctionResponse]:
+        job_result = self._require_job_queue().result(run_id)
+        if job_result is None:
+            raise ValueError(f"No job found for run '{run_id}'.")
+        if job_result.status == JobStatus.FAILED:
+            raise RuntimeError(f"Run '{run_id}' failed: {job_result.error}")
+        return job_result.response if job_result.status == JobStatus.COMPLETED else None
 
+    def result(self, run_id: str, timeout: Optional[float] = None, poll_interval: float = 0.1) -> FunctionResponse:
+        """Wait for a submitted run and return its response.
+
+        Raises RuntimeError when the run failed and TimeoutError when it is still pending after
+        ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            response = self._job_response(run_id)
+            if response is not None:
+                return response
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Run '{run_id}' did not finish within {timeout}s.")
+            time.sleep(poll_interval if deadline is None else min(poll_interval, max(deadline - time.monotonic(), 0.0)))
+
+    async def aresult(self, run_id: str, timeout: Optional[float] = None, poll_interval: float = 0.1) -> FunctionResponse:
+        """Asynchronous counterpart of ``result``."""
+        deadline = None if timeout is None else time.monotonic() + timeout
         while True:
+            response = self._job_response(run_id)
+            if response is not None:
+                return response
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Run '{run_id}' did not finish within {timeout}s.")
+            await asyncio.sleep(poll_interval if deadline is None else min(poll_interval, max(deadline - time.monotonic(), 0.0)))
+
+    def work(
+        self,
+        pools: Sequence[str] = (DEFAULT_POOL,),
+        concurrency: int = 1,
+        poll_interval: float = 1.0,
+        lease: float = 600.0,
+        max_jobs: Optional[int] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> int:
+        """Execute submitted runs from the job queue until ``stop`` is set or ``max_jobs`` jobs are done.
+
+        Only nodes of ``pools`` run here: a run reaching a node of another pool is queued again for
+        that pool's workers, so each tier (e.g. LLM routers and CPU-bound functions) scales on its
+        own. Parallel branches run where their fan-out ran. ``lease`` (seconds) must exceed the
+        longest job; a claim held longer is presumed lost and the job is given to another worker.
+        Returns the number of jobs processed.
+        """
+        job_queue = self._require_job_queue()
+        pools = tuple(pools)
+        served = frozenset(pools)
+        stop = stop or threading.Event()
+        lock = threading.Lock()
+        processed = 0
+
+        def loop():
+            nonlocal processed
+            while not stop.is_set():
+                with lock:
+                    if max_jobs is not None and processed >= max_jobs:
+                        return
+                    # Reserved before claiming, so concurrent loops never overshoot 'max_jobs'
+                    processed += 1
+                job = job_queue.claim(pools, lease)
+                if job is None:
+                    with lock:
+                        processed -= 1
+                    stop.wait(poll_interval)
+                    continue
+                self._work_on(job_queue, job, served)
+
+        logger.info("Worker started for pool(s) %s with concurrency %s", ", ".join(pools), concurrency)
+        if concurrency <= 1:
+            loop()
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fcc-worker") as pool:
+                for future in [pool.submit(loop) for _ in range(concurrency)]:
+                    future.result()
+        return processed
+
+    def _work_on(self, job_queue: JobQueue, job: Job, pools: FrozenSet[str]):
+        """Run one claimed job up to the end of the chain or the next node of another pool."""
+        plan = self.compile()
+        node = plan.nodes.get(job.node)
+        if node is None:
+            logger.error("Run %s stopped at '%s', which is no longer in the graph.", job.run_id, job.node)
+            job_queue.fail(job, f"Node '{job.node}' is no longer in the graph.")
+            return
+        logger.info("Worker took run %s at %s (attempt %s)", job.run_id, job.node, job.attempts)
+        ctx = _RunContext(plan, job.trace, job.input_value, None, self._metrics, job.run_id, pools=pools)
+        ctx.steps.extend(job.steps)
+        try:
+            if job.segment == 0:
+                self._trigger_callbacks(CallbackPoints.INITIALIZATION, ctx.system_state)
+                self._trigger_callbacks(CallbackPoints.LOOP_START, ctx.system_state)
+            output = self._run_path(ctx, node, job.input_value)
+        except _Handoff as handoff:
+            next_job = job._replace(
+                node=handoff.node.func.__name__, input_value=handoff.input_value, steps=list(ctx.steps),
+                pool=handoff.node.pool, segment=job.segment + 1,
+            )
+            store, outcome = partial(job_queue.handoff, job, next_job), f"handed to pool '{handoff.node.pool}'"
+        except Exception as e:
+            logger.error("Run %s failed: %s: %s", job.run_id, type(e).__name__, e)
+            store, outcome = partial(job_queue.fail, job, f"{type(e).__name__}: {e}"), "failed"
+        else:
+            store, outcome = partial(job_queue.complete, job, ctx.response(output)), "completed"
+        try:
+            stored = store()
+        except Exception as e:
+            # e.g. an unpicklable payload
+            logger.error("Could not store run %s: %s", job.run_id, e)
+            stored = job_queue.fail(job, f"Could not store the run: {type(e).__name__}: {e}")
+            outcome = "failed"
+        if stored:
+            logger.info("Run %s %s", job.run_id, outcome)
+        else:
+            logger.warning("Lost the claim on run %s before it was stored; another worker will redo it.", job.run_id)
+
+    def compile(self) -> ExecutionPlan:
+        """Validate the graph and cache an immutable execution plan.
+
+        The plan is rebuilt lazily after any ``register_function`` or ``create_edge`` call. Runs share
+        it read-only; a run started before a graph change keeps the plan it started with.
+        """
+        plan = self._plan
+        if plan is not None:
+            return plan
+        with self._lock:
+            if self._plan is None:
+                plan = ExecutionPlan(self.functions)
+                for name, node in plan.nodes.items():
+                    if isinstance(node, RouterNode):
+                        node.prepare(plan.successors[name])
+                # Published only once complete, so concurrent runs never see a half-built plan
+                self._plan = plan
+                logger.info("Compiled execution plan with %s node(s), entry '%s'", len(plan.nodes), plan.entry.func.__name__)
+            return self._plan
+
+    def run(self, initial_input: Any, trace: str = TraceMode.FULL, run_id: Optional[str] = None) -> FunctionResponse:
+        """Run the chain on one input.
+
+        ``trace`` controls what is recorded per step: ``'full'`` keeps inputs and outputs,
+        ``'summary'`` keeps names, timings and payload sizes, ``'none'`` records nothing.
+        With a checkpoint store, ``run_id`` names the run for ``resume`` (a random id by default).
+        """
+        return self._execute(self._context(trace, initial_input, run_id=run_id), initial_input)
+
+    def stream(self, initial_input: Any, trace: str = TraceMode.FULL) -> Iterator[StepEvent]:
+        """Run the chain and yield a ``StepEvent`` as each step starts and finishes.
+
+        Events are ``node_started``, ``router_decided`` and ``node_finished``, followed by one
+        ``final_output`` event carrying the ``FunctionResponse``. The chain runs on a background
+        thread; closing the generator early stops it at the next step.
+        """
+        events: "queue.Queue" = queue.Queue()
+        closed = threading.Event()
+        finished = object()
+
+        def sink(event: StepEvent):
+            if closed.is_set():
+                raise _StreamClosed("Stream closed by the consumer.")
+            events.put(event)
+
+        ctx = self._context(trace, initial_input, sink)
+        outcome: Dict[str, Any] = {}
+
+        def worker():
+            try:
+                outcome["response"] = self._execute(ctx, initial_input)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                events.put(finished)
+
+        threading.Thread(target=worker, name="fcc-stream", daemon=True).start()
+        try:
+            while True:
+                event = events.get()
+                if event is finished:
+                    break
+                yield event
+        finally:
+            closed.set()
+        if "error" in outcome:
+            raise outcome["error"]
+        response = outcome["response"]
+        yield StepEvent(type=StreamEvents.FINAL_OUTPUT, output_value=response.final_output, response=response)
+
+    def _execute(self, ctx: _RunContext, initial_input: Any, start: Optional[FunctionNode] = None) -> FunctionResponse:
+        # Trigger Initialization Callbacks
+        self._trigger_callbacks(CallbackPoints.INITIALIZATION, ctx.system_state)
+
+        # Trigger Loop Start Callbacks
+        self._trigger_callbacks(CallbackPoints.LOOP_START, ctx.system_state)
+
+        if ctx.checkpoints is None:
+            output = self._run_path(ctx, start or ctx.plan.entry, initial_input)
+        else:
+            try:
+                output = self._run_path(ctx, start or ctx.plan.entry, initial_input)
+            except _StreamClosed:
+                ctx.abandon()
+                raise
+            except Exception as e:
+                ctx.fail(e)
+                raise
+            ctx.complete(output)
+
+        function_response = ctx.response(output)
+        return function_response
+
+    def _speculate(self, router: RouterNode, candidates: Sequence[FunctionNode], input_value: Any) -> Dict[str, Any]:
+        """Start the router's likeliest pure branches on the branch executor; futures keyed by function name."""
+        executor = self._get_branch_executor()
+        return {node.func.__name__: executor.submit(_timed_call, node, input_value) for node in router.likely_branches(candidates)}
+
+    def _aspeculate(self, router: RouterNode, candidates: Sequence[FunctionNode], input_value: Any) -> Dict[str, Any]:
+        async def timed(node: FunctionNode) -> Tuple[Any, Optional[bool], float]:
+            started = time.perf_counter()
+            output, cached = await node.acall(input_value, self.executor)
+            return output, cached, time.perf_counter() - started
+        return {node.func.__name__: asyncio.ensure_future(timed(node)) for node in router.likely_branches(candidates)}
+
+    def _settle_speculation(self, router: RouterNode, speculative: Dict[str, Any], chosen: Optional[FunctionNode]) -> Optional[Any]:
+        """Keep the chosen branch's speculative run, if there is one, and cancel and discard the rest."""
+        winner = speculative.pop(chosen.func.__name__, None) if chosen is not None else None
+        for future in speculative.values():
+            future.cancel()
+            future.add_done_callback(_discard_result)
+        if winner is not None:
+            # In case the run ends before the winner's result is taken
+            winner.add_done_callback(_discard_result)
+        if chosen is not None:
+            if self._metrics is not None:
+                self._metrics.observe_speculation(router.func.__name__, winner is not None, len(speculative))
+            logger.info("Speculation for %s %s; discarded %s run(s)", router.func.__name__, "hit" if winner is not None else "missed", len(speculative))
+        return winner
+
+    def _run_path(self, ctx: _RunContext, current_node: Optional[FunctionNode], input_value: Any, stop_at: Optional[FunctionNode] = None) -> Any:
+        """Walk the plan from ``current_node`` until the chain ends (or reaches ``stop_at``); return the last output."""
+        plan = ctx.plan
+        system_state = ctx.system_state
+        # The next node's speculative run, started while its router decided
+        speculated = None
+        while current_node is not None and current_node is not stop_at:
+            # Parallel branches run where their fan-out ran
+            if ctx.pools is not None and stop_at is None and current_node.pool not in ctx.pools:
+                raise _Handoff(current_node, input_value)
+            # Parallel branches (stop_at set) are covered by the checkpoint taken before their fan-out
+            if ctx.checkpoints is not None and stop_at is None:
+                ctx.checkpoint(current_node, input_value)
             system_state["current_node"] = current_node.func.__name__
             system_state["input_value"] = input_value
+            ctx.emit(StreamEvents.NODE_STARTED, function_name=current_node.func.__name__, input_value=input_value)
 
             if isinstance(current_node, RouterNode):
                 # Trigger Inner Loop Start Callbacks
                 self._trigger_callbacks(CallbackPoints.INNER_LOOP_START, system_state)
 
-                next_node = current_node.decide_path(input_value)
+                started = time.perf_counter()
+                speculative = decision = None
+                try:
+                    input_value = current_node.execute(input_value)
+                    candidates = plan.successors[current_node.func.__name__]
+                    if current_node.speculate:
+                        # A worker only speculates on branches it would run itself
+                        local = candidates if ctx.pools is None else [node for node in candidates if node.pool in ctx.pools]
+                        speculative = self._speculate(current_node, local, input_value)
+                    decision = current_node.route(input_value, candidates)
+                except Exception:
+                    ctx.record_error(current_node.func.__name__, time.perf_counter() - started)
+                    raise
+                finally:
+                    if speculative and decision is None:
+                        self._settle_speculation(current_node, speculative, None)
+                duration = time.perf_counter() - started
+                next_node = decision.node
+                if speculative:
+                    speculated = self._settle_speculation(current_node, speculative, next_node)
+                    # Not started yet: run it inline instead of waiting for a pool thread
+                    if speculated is not None and speculated.cancel():
+                        speculated = None
 
                 # Update system state after deciding path
                 system_state["output_value"] = next_node.func.__name__
 
-                steps.append(FunctionStep(function_name=current_node.func.__name__, input_value=input_value, output_value="Router decided the next function."))
-                logger.info(f"Final output: {Colors.OKGREEN}{next_node.func.__name__}{Colors.ENDC}")
-
-                # Trigger After Node Execution Callbacks
-                self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
-
-                current_node = next_node
-                break  # Assuming router decides the next step and we execute it next
+                ctx.record(current_node.func.__name__, input_value, "Router decided the next function.", duration, decision)
+                ctx.emit(
+                    StreamEvents.ROUTER_DECIDED, function_name=current_node.func.__name__, input_value=input_value,
+                    next_function=next_node.func.__name__, routed_by=decision.routed_by, confidence=decision.confidence, duration=duration,
+                )
+                logger.info("Router chose: %s (by %s)", next_node.func.__name__, decision.routed_by)
             else:
-                if len(current_node.edges) > 1:
-                    raise ValueError(f"Function '{current_node.func.__name__}' has multiple outgoing edges. Use a router node to handle branching.")
-                elif len(current_node.edges) == 0:
-                    # End of the chain
-                    output = current_node.execute(input_value)
-                    steps.append(FunctionStep(function_name=current_node.func.__name__, input_value=input_value, output_value=output))
-                    logger.info(f"Final output: {Colors.OKGREEN}{output}{Colors.ENDC}")
-
-                    # Update system state
-                    system_state["output_value"] = output
-
-                    # Trigger After Node Execution Callbacks
-                    self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
-                    break
-                next_node = current_node.edges[0]
+                next_node = plan.next_node(current_node)
 
-                output = current_node.execute(input_value)
-                steps.append(FunctionStep(function_name=current_node.func.__name__, input_value=input_value, output_value=output))
+                started = time.perf_counter()
+                try:
+                    if speculated is None:
+                        output, cached = current_node.call(input_value)
+                        duration = time.perf_counter() - started
+                    else:
+                        output, cached, duration = speculated.result()
+                except Exception:
+                    ctx.record_error(current_node.func.__name__, time.perf_counter() - started)
+                    raise
+                finally:
+                    speculated = None
+                ctx.record(current_node.func.__name__, input_value, output, duration, cached=cached)
+                ctx.emit(
+                    StreamEvents.NODE_FINISHED, function_name=current_node.func.__name__, input_value=input_value,
+                    output_value=output, cached=bool(cached), duration=duration,
+                )
 
                 # Update system state
                 system_state["output_value"] = output
+                input_value = output
+
+                fanout = plan.fanouts.get(current_node.func.__name__)
+                if fanout is not None:
+                    self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
+                    input_value = self._run_fanout(ctx, fanout, output)
+                    current_node = fanout.join
+                    continue
+                if next_node is None and stop_at is None:
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("Final output: %s", preview(output))
+
+            # Trigger After Node Execution Callbacks
+            self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
+
+            current_node = next_node
+
+        return input_value
+
+    def _run_fanout(self, ctx: _RunContext, fanout: FanOut, value: Any) -> Any:
+        """Run parallel branches concurrently and build the join node's input.
+
+        Branch steps are appended in fan-out edge order, whatever order the branches finish in.
+        """
+        def run_branch(head: FunctionNode):
+            branch_ctx = ctx.branch(value)
+            return self._run_path(branch_ctx, head, value, stop_at=fanout.join), branch_ctx.steps
+
+        logger.info("Fanning out to %s parallel branch(es), joining at %s", len(fanout.branches), fanout.join.func.__name__)
+        results = _map_concurrently(self._get_branch_executor(), run_branch, fanout.branches)
+        outputs = []
+        for output, branch_steps in results:
+            ctx.steps.extend(branch_steps)
+            outputs.append(output)
+        return fanout.join.join_input(fanout.branches, outputs)
+
+    async def arun(self, initial_input: Any, trace: str = TraceMode.FULL, run_id: Optional[str] = None) -> FunctionResponse:
+        """Asynchronous counterpart of ``run``.
+
+        ``async def`` functions and callbacks are awaited, routers use the async OpenAI client,
+        and sync functions are offloaded to ``self.executor`` so they never block the event loop.
+        Parallel branches run as concurrent tasks.
+        """
+        return await self._aexecute(self._context(trace, initial_input, run_id=run_id), initial_input)
+
+    async def astream(self, initial_input: Any, trace: str = TraceMode.FULL) -> AsyncIterator[StepEvent]:
+        """Asynchronous counterpart of ``stream``, built on ``arun``."""
+        events: "asyncio.Queue[StepEvent]" = asyncio.Queue()
+        ctx = self._context(trace, initial_input, events.put_nowait)
+        task = asyncio.ensure_future(self._aexecute(ctx, initial_input))
+        try:
+            while True:
+                getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                while not events.empty():
+                    yield events.get_nowait()
+                response = task.result()
+                yield StepEvent(type=StreamEvents.FINAL_OUTPUT, output_value=response.final_output, response=response)
+                return
+        finally:
+            if not task.done():
+                task.cancel()
 
-                # Trigger After Node Execution Callbacks
-                self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
+    async def _aexecute(self, ctx: _RunContext, initial_input: Any, start: Optional[FunctionNode] = None) -> FunctionResponse:
+        await self._atrigger_callbacks(CallbackPoints.INITIALIZATION, ctx.system_state)
+        await self._atrigger_callbacks(CallbackPoints.LOOP_START, ctx.system_state)
 
+        if ctx.checkpoints is None:
+            output = await self._arun_path(ctx, start or ctx.plan.entry, initial_input)
+        else:
+            try:
+                output = await self._arun_path(ctx, start or ctx.plan.entry, initial_input)
+            except asyncio.CancelledError:
+                # e.g. 'astream' closed early; an Exception before Python 3.8
+                ctx.abandon()
+                raise
+            except Exception as e:
+                ctx.fail(e)
+                raise
+            ctx.complete(output)
+
+        return ctx.response(output)
+
+    async def _arun_path(self, ctx: _RunContext, current_node: Optional[FunctionNode], input_value: Any, stop_at: Optional[FunctionNode] = None) -> Any:
+        plan = ctx.plan
+        system_state = ctx.system_state
+        speculated = None
+        while current_node is not None and current_node is not stop_at:
+            # Parallel branches (stop_at set) are covered by the checkpoint taken before their fan-out
+            if ctx.checkpoints is not None and stop_at is None:
+                ctx.checkpoint(current_node, input_value)
+            system_state["current_node"] = current_node.func.__name__
+            system_state["input_value"] = input_value
+            ctx.emit(StreamEvents.NODE_STARTED, function_name=current_node.func.__name__, input_value=input_value)
+
+            if isinstance(current_node, RouterNode):
+                await self._atrigger_callbacks(CallbackPoints.INNER_LOOP_START, system_state)
+
+                started = time.perf_counter()
+                speculative = decision = None
+                try:
+                    input_value = await current_node.aexecute(input_value, self.executor)
+                    candidates = plan.successors[current_node.func.__name__]
+                    if current_node.speculate:
+                        speculative = self._aspeculate(current_node, candidates, input_value)
+                    decision = await current_node.aroute(input_value, candidates)
+                except Exception:
+                    ctx.record_error(current_node.func.__name__, time.perf_counter() - started)
+                    raise
+                finally:
+                    if speculative and decision is None:
+                        self._settle_speculation(current_node, speculative, None)
+                duration = time.perf_counter() - started
+                next_node = decision.node
+                if speculative:
+                    speculated = self._settle_speculation(current_node, speculative, next_node)
+
+                system_state["output_value"] = next_node.func.__name__
+
+                ctx.record(current_node.func.__name__, input_value, "Router decided the next function.", duration, decision)
+                ctx.emit(
+                    StreamEvents.ROUTER_DECIDED, function_name=current_node.func.__name__, input_value=input_value,
+                    next_function=next_node.func.__name__, routed_by=decision.routed_by, confidence=decision.confidence, duration=duration,
+                )
+                logger.info("Router chose: %s (by %s)", next_node.func.__name__, decision.routed_by)
+            else:
+                next_node = plan.next_node(current_node)
+
+                started = time.perf_counter()
+                try:
+                    if speculated is None:
+                        output, cached = await current_node.acall(input_value, self.executor)
+                        duration = time.perf_counter() - started
+                    else:
+                        output, cached, duration = await speculated
+                except Exception:
+                    ctx.record_error(current_node.func.__name__, time.perf_counter() - started)
+                    raise
+                finally:
+                    speculated = None
+                ctx.record(current_node.func.__name__, input_value, output, duration, cached=cached)
+                ctx.emit(
+                    StreamEvents.NODE_FINISHED, function_name=current_node.func.__name__, input_value=input_value,
+                    output_value=output, cached=bool(cached), duration=duration,
+                )
+
+                system_state["output_value"] = output
                 input_value = output
-                current_node = next_node
 
-        # Execute additional callbacks if any
-        # (Not necessary here as all callbacks are already triggered during the run)
+                fanout = plan.fanouts.get(current_node.func.__name__)
+                if fanout is not None:
+                    await self._atrigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
+                    input_value = await self._arun_fanout(ctx, fanout, output)
+                    current_node = fanout.join
+                    continue
+                if next_node is None and stop_at is None:
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("Final output: %s", preview(output))
 
-        function_response = FunctionResponse(steps=steps, final_output=output)
-        return function_response
+            await self._atrigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, system_state)
+
+            current_node = next_node
+
+        return input_value
+
+    async def _arun_fanout(self, ctx: _RunContext, fanout: FanOut, value: Any) -> Any:
+        async def run_branch(head: FunctionNode):
+            branch_ctx = ctx.branch(value)
+            return await self._arun_path(branch_ctx, head, value, stop_at=fanout.join), branch_ctx.steps
+
+        logger.info("Fanning out to %s parallel branch(es), joining at %s", len(fanout.branches), fanout.join.func.__name__)
+        results = await asyncio.gather(*(run_branch(head) for head in fanout.branches))
+        outputs = []
+        for output, branch_steps in results:
+            ctx.steps.extend(branch_steps)
+            outputs.append(output)
+        return fanout.join.join_input(fanout.branches, outputs)
+
+    def run_batch(self, inputs: Sequence[Any], max_batch_size: int = 20, max_wait: float = 0.0, trace: str = TraceMode.FULL) -> List[FunctionResponse]:
+        """Run many inputs through the chain, routing items that meet at a router together.
+
+        Items advance in lockstep, grouped by the node they are at. Batched functions run once per
+        group; other functions run per item. Items queued at a router are routed with one request per
+        ``max_batch_size`` chunk; a partial batch is held back for up to ``max_wait`` seconds while
+        other items are still moving and may join it. Parallel fan-outs run per item, as in ``run``.
+        Step durations of grouped calls are split evenly across the group. Responses are returned in
+        input order.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        plan = self.compile()
+        items = [_BatchItem(plan.entry, input_value, _RunContext(plan, trace, input_value, metrics=self._metrics)) for input_value in inputs]
+        for item in items:
+            self._trigger_callbacks(CallbackPoints.INITIALIZATION, item.ctx.system_state)
+            self._trigger_callbacks(CallbackPoints.LOOP_START, item.ctx.system_state)
+
+        active = list(items)
+        pending: Dict[str, List[_BatchItem]] = {}
+        first_queued: Dict[str, float] = {}
+
+        while active or pending:
+            groups: Dict[str, List[_BatchItem]] = {}
+            for item in active:
+                item.ctx.system_state["current_node"] = item.node.func.__name__
+                item.ctx.system_state["input_value"] = item.input_value
+                groups.setdefault(item.node.func.__name__, []).append(item)
+
+            active = []
+            for name, group in groups.items():
+                node = plan.nodes[name]
+                if isinstance(node, RouterNode):
+                    for item in group:
+                        self._trigger_callbacks(CallbackPoints.INNER_LOOP_START, item.ctx.system_state)
+                        item.input_value = node.execute(item.input_value)
+                    pending.setdefault(name, []).extend(group)
+                    first_queued.setdefault(name, time.monotonic())
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    outputs, hits = node.call_batch([item.input_value for item in group])
+                except Exception:
+                    duration = (time.perf_counter() - started) / len(group)
+                    for item in group:
+                        item.ctx.record_error(name, duration)
+                    raise
+                duration = (time.perf_counter() - started) / len(group)
+                fanout = plan.fanouts.get(name)
+                next_node = fanout.join if fanout is not None else plan.next_node(node)
+                for item, output, cached in zip(group, outputs, hits):
+                    item.ctx.record(name, item.input_value, output, duration, cached=cached)
+                    item.ctx.system_state["output_value"] = output
+                    self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, item.ctx.system_state)
+                    item.output = output
+                    item.input_value = output
+                    if fanout is not None:
+                        item.input_value = self._run_fanout(item.ctx, fanout, output)
+                    item.node = next_node
+                    if next_node is not None:
+                        active.append(item)
+
+            now = time.monotonic()
+            for name in list(pending):
+                queued = pending[name]
+                # Flush when full, when the wait budget is spent, or when nothing else can arrive
+                if len(queued) < max_batch_size and active and now - first_queued[name] < max_wait:
+                    continue
+                del pending[name], first_queued[name]
+                router = plan.nodes[name]
+                started = time.perf_counter()
+                try:
+                    decisions = router.route_many([item.input_value for item in queued], plan.successors[name], max_batch_size)
+                except Exception:
+                    duration = (time.perf_counter() - started) / len(queued)
+                    for item in queued:
+                        item.ctx.record_error(name, duration)
+                    raise
+                duration = (time.perf_counter() - started) / len(queued)
+                for item, decision in zip(queued, decisions):
+                    item.ctx.system_state["output_value"] = decision.node.func.__name__
+                    item.ctx.record(name, item.input_value, "Router decided the next function.", duration, decision)
+                    self._trigger_callbacks(CallbackPoints.AFTER_NODE_EXECUTION, item.ctx.system_state)
+                    item.node = decision.node
+                    active.append(item)
+
+        return [item.ctx.response(item.output) for item in items]
 
     def _trigger_callbacks(self, callback_point: str, system_state: Dict[str, Any]):
         callbacks = self.callbacks.get(callback_point, [])
         for callback in callbacks:
             try:
-                callback(self, system_state)
+                result = callback(self, system_state)
+                if inspect.isawaitable(result):
+                    _run_coroutine_sync(result)
             except Exception as e:
-                logger.error(f"Error in callback at '{callback_point}': {e}")
+                logger.error("Error in callback at '%s': %s", callback_point, e)
+
+    async def _atrigger_callbacks(self, callback_point: str, system_state: Dict[str, Any]):
+        callbacks = self.callbacks.get(callback_point, [])
+        loop = asyncio.get_running_loop()
+        for callback in callbacks:
+            try:
+                if inspect.iscoroutinefunction(callback):
+                    await callback(self, system_state)
+                elif isinstance(callback, DeferredCallback) and not callback.blocking:
+                    # Enqueueing never blocks, so there is nothing to offload
+                    callback(self, system_state)
+                else:
+                    result = await loop.run_in_executor(self.executor, partial(callback, self, system_state))
+                    if inspect.isawaitable(result):
+                        await result
+            except Exception as e:
+                logger.error("Error in callback at '%s': %s", callback_point, e)
 
 def register_function(
     input_type: type,
@@ -329,6 +2159,18 @@ def register_function(
     direction_prompt: Optional[str] = None,
     router_system_prompt: Optional[str] = None,
     description_for_routing: Optional[str] = None,
+    routing_cache: Optional[CacheBackend] = None,
+    batched: bool = False,
+    is_join: bool = False,
+    executor: Optional[str] = None,
+    router_backend: Optional[RouterBackend] = None,
+    confidence_threshold: Optional[float] = None,
+    pure: bool = False,
+    speculate: int = 0,
+    cache: Optional[CacheBackend] = None,
+    input_budget: Optional[int] = None,
+    input_reducer: Union[InputReducer, Callable[[Any], Any], None] = None,
+    pool: Optional[str] = None,
 ):
     def decorator(func: Callable):
         coordinator = CoordinatorInstance.get_instance()
@@ -339,19 +2181,58 @@ def register_function(
             is_router,
             direction_prompt,
             router_system_prompt,
-            description_for_routing
+            description_for_routing,
+            routing_cache,
+            batched,
+            is_join,
+            executor,
+            router_backend,
+            confidence_threshold,
+            pure,
+            speculate,
+            cache,
+            input_budget,
+            input_reducer,
+            pool
         )
     return decorator
 
 class CoordinatorInstance:
     _instance: Optional[Coordinator] = None
+    _lock = threading.Lock()
 
     @classmethod
-    def initialize(cls, openai_api_key: Optional[str] = None, system_prompt: Optional[str] = None):
-        if cls._instance is None:
-            cls._instance = Coordinator(openai_api_key, system_prompt)
-            logger.info(f"{Colors.OKGREEN}Coordinator instance initialized.{Colors.ENDC}")
-        return cls._instance
+    def initialize(
+        cls,
+        openai_api_key: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        clients: Optional[OpenAIClients] = None,
+        routing_cache: Optional[CacheBackend] = None,
+        branch_executor: Optional[Executor] = None,
+        process_pool_size: Optional[int] = None,
+        metrics: Union[bool, Metrics] = False,
+        decision_log: Optional[Union[str, DecisionLog]] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        job_queue: Optional[JobQueue] = None,
+    ):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = Coordinator(
+                    openai_api_key,
+                    system_prompt,
+                    executor,
+                    clients,
+                    routing_cache,
+                    branch_executor,
+                    process_pool_size,
+                    metrics,
+                    decision_log,
+                    checkpoint_store,
+                    job_queue,
+                )
+                logger.info("Coordinator instance initialized.")
+            return cls._instance
 
     @classmethod
     def get_instance(cls) -> Coordinator:
@@ -0,0 +1,329 @@
+# jobs.py
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from .checkpoint import _check_run_id
+from .storage import connect_per_thread, dump_atomic
+
+# Pool of nodes registered without one
+DEFAULT_POOL = "default"
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    COMPLETED = "completed"
+
+
+class Job(NamedTuple):
+    """The next segment of a queued run: the node to execute and its input, plus the steps so far.
+
+    A run is split into segments wherever it moves to a node of another worker pool. ``attempts``
+    counts claims of the current segment; a worker's claim is valid only while it matches.
+    """
+    run_id: str
+    node: str
+    input_value: Any
+    steps: List[Any]
+    trace: str
+    pool: str = DEFAULT_POOL
+    segment: int = 0
+    attempts: int = 0
+
+
+class JobResult(NamedTuple):
+    """Where a submitted run stands; ``response`` is set once it completes, ``error`` if it failed."""
+    run_id: str
+    status: str
+    response: Any = None
+    error: Optional[str] = None
+    updated_at: float = 0.0
+
+
+class JobQueue:
+    """Interface for the queue between ``Coordinator.submit`` and ``coordinator-worker`` processes.
+
+    Delivery is at least once: a claim is a lease, and a segment whose worker dies is claimed again
+    once the lease expires, up to ``max_attempts`` claims. Jobs and responses are pickled, so the
+    payloads of a queued chain must be picklable. Backends for other brokers implement ``put``,
+    ``claim``, ``handoff``, ``complete``, ``fail``, ``result`` and ``delete``.
+    """
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+
+    def put(self, job: Job) -> None:
+        """Enqueue a new run; raises ValueError when the run id is taken."""
+        raise NotImplementedError
+
+    def claim(self, pools: Sequence[str], lease: float) -> Optional[Job]:
+        """Take the oldest queued segment of one of ``pools``, or None when there is none."""
+        raise NotImplementedError
+
+    def handoff(self, claimed: Job, job: Job) -> bool:
+        """Replace a claimed segment with the run's next one. False when the claim was lost."""
+        raise NotImplementedError
+
+    def complete(self, claimed: Job, response: Any) -> bool:
+        raise NotImplementedError
+
+    def fail(self, claimed: Job, error: str) -> bool:
+        raise NotImplementedError
+
+    def result(self, run_id: str) -> Optional[JobResult]:
+        """Status of a submitted run, or None for an unknown run id."""
+        raise NotImplementedError
+
+    def delete(self, run_id: str) -> None:
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """Jobs in a SQLite database, shareable between processes on the same host."""
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        super().__init__(max_attempts)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "run_id TEXT PRIMARY KEY, pool TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+                "lease_until REAL, updated_at REAL NOT NULL, job BLOB, response BLOB, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (pool, status, updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit, so 'claim' can take the write lock up front with BEGIN IMMEDIATE
+        return connect_per_thread(self._local, self.path, isolation_level=None)
+
+    def put(self, job: Job) -> None:
+        blob = pickle.dumps(job, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            self._connect().execute(
+                "INSERT INTO jobs (run_id, pool, status, attempts, updated_at, job) VALUES (?, ?, ?, 0, ?, ?)",
+                (_check_run_id(job.run_id), job.pool, JobStatus.QUEUED, time.time(), blob),
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Run '{job.run_id}' was already submitted.") from None
+
+    def claim(self, pools: Sequence[str], lease: float) -> Optional[Job]:
+        conn = self._connect()
+        placeholders = ", ".join("?" * len(pools))
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT run_id, attempts, job FROM jobs WHERE pool IN ({placeholders}) "
+                    "AND (status = ? OR (status = ? AND lease_until < ?)) ORDER BY updated_at LIMIT 1",
+                    (*pools, JobStatus.QUEUED, JobStatus.RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                run_id, attempts, blob = row
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, job = NULL, updated_at = ? WHERE run_id = ?",
+                        (JobStatus.FAILED, f"Abandoned after {attempts} attempt(s); the worker was lost each time.", now, run_id),
+                    )
+                    conn.execute("COMMIT")
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, lease_until = ?, updated_at = ? WHERE run_id = ?",
+                    (JobStatus.RUNNING, attempts + 1, now + lease, now, run_id),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return pickle.loads(blob)._replace(attempts=attempts + 1)
+
+    def _finish(self, claimed: Job, assignments: str, values: tuple) -> bool:
+        cursor = self._connect().execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE run_id = ? AND status = ? AND attempts = ?",
+            (*values, time.time(), claimed.run_id, JobStatus.RUNNING, claimed.attempts),
+        )
+        return cursor.rowcount == 1
+
+    def handoff(self, claimed: Job, job: Job) -> bool:
+        blob = pickle.dumps(job._replace(attempts=0), protocol=pickle.HIGHEST_PROTOCOL)
+        return self._finish(claimed, "pool = ?, status = ?, attempts = 0, lease_until = NULL, job = ?", (job.pool, JobStatus.QUEUED, blob))
+
+    def complete(self, claimed: Job, response: Any) -> bool:
+        blob = pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+        return self._finish(claimed, "status = ?, job = NULL, response = ?", (JobStatus.COMPLETED, blob))
+
+    def fail(self, claimed: Job, error: str) -> bool:
+        return self._finish(claimed, "status = ?, job = NULL, error = ?", (JobStatus.FAILED, error))
+
+    def result(self, run_id: str) -> Optional[JobResult]:
+        row = self._connect().execute(
+            "SELECT status, response, error, updated_at FROM jobs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, response, error, updated_at = row
+        return JobResult(run_id, status, pickle.loads(response) if response is not None else None, error, updated_at)
+
+    def delete(self, run_id: str) -> None:
+        self._connect().execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+
+
+class FileJobQueue(JobQueue):
+    """Jobs as files in ``directory``, e.g. on a volume shared by several hosts.
+
+    Queued segments live in ``queued/<pool>/``; a worker claims one by renaming it into
+    ``running/`` under a name carrying its attempt and lease deadline, and only one rename can
+    win. ``results/`` holds each run's status: queued from ``put`` on, then its outcome.
+    """
+
+    def __init__(self, directory: str, max_attempts: int = 3):
+        super().__init__(max_attempts)
+        self.directory = directory
+        for name in ("queued", "running", "results"):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def _dir(self, *parts: str) -> str:
+        return os.path.join(self.directory, *parts)
+
+    def _write(self, path: str, value: Any):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        dump_atomic(path, value)
+
+    def _enqueue(self, job: Job):
+        # The attempt count is part of the name, so a requeued segment keeps it
+        self._write(self._dir("queued", job.pool, f"{job.run_id}~{job.attempts}.job"), job)
+
+    def _running(self, run_id: str) -> List[str]:
+        return [name for name in os.listdir(self._dir("running")) if name.startswith(run_id + "~") and name.endswith(".job")]
+
+    def _queued(self, run_id: str) -> List[str]:
+        return [
+            self._dir("queued", pool, name)
+            for pool in os.listdir(self._dir("queued"))
+            for name in os.listdir(self._dir("queued", pool))
+            if name.startswith(run_id + "~") and name.endswith(".job")
+        ]
+
+    def put(self, job: Job) -> None:
+        _check_run_id(job.run_id)
+        if self.result(job.run_id) is not None:
+            raise ValueError(f"Run '{job.run_id}' was already submitted.")
+        # Written before the segment, so a worker's result can't be overwritten by it
+        self._write(self._dir("results", f"{job.run_id}.result"), JobResult(job.run_id, JobStatus.QUEUED, updated_at=time.time()))
+        self._enqueue(job._replace(attempts=0))
+
+    def _requeue_expired(self, now: float):
+        for name in os.listdir(self._dir("running")):
+            run_id, attempts, deadline = name[:-4].split("~")
+            if float(deadline) >= now:
+                continue
+            path = self._dir("running", name)
+            try:
+                with open(path, "rb") as f:
+                    job = pickle.load(f)
+                os.rename(path, self._dir("queued", job.pool, f"{run_id}~{attempts}.job"))
+            except FileNotFoundError:
+                # Finished, or requeued by another worker
+                pass
+
+    def claim(self, pools: Sequence[str], lease: float) -> Optional[Job]:
+        now = time.time()
+        self._requeue_expired(now)
+        queued = []
+        for pool in pools:
+            directory = self._dir("queued", pool)
+            try:
+                names = os.listdir(directory)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.endswith(".job"):
+                    path = os.path.join(directory, name)
+                    try:
+                        queued.append((os.stat(path).st_mtime, path, name))
+                    except FileNotFoundError:
+                        pass
+        for _, path, name in sorted(queued):
+            run_id, attempts = name[:-4].split("~")
+            attempts = int(attempts) + 1
+            claimed = self._dir("running", f"{run_id}~{attempts}~{now + lease:.6f}.job")
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+            with open(claimed, "rb") as f:
+                job = pickle.load(f)._replace(attempts=attempts)
+            if attempts > self.max_attempts:
+                self._write(self._dir("results", f"{run_id}.result"), JobResult(
+                    run_id, JobStatus.FAILED, error=f"Abandoned after {attempts - 1} attempt(s); the worker was lost each time.", updated_at=now,
+                ))
+                os.unlink(claimed)
+                continue
+            return job
+        return None
+
+    def _release(self, claimed: Job) -> Optional[str]:
+        """Path of the claim, if the worker still holds it."""
+        for name in self._running(claimed.run_id):
+            if name.split("~")[1] == str(claimed.attempts):
+                return self._dir("running", name)
+        return None
+
+    def handoff(self, claimed: Job, job: Job) -> bool:
+        path = self._release(claimed)
+        if path is None:
+            return False
+        self._enqueue(job._replace(attempts=0))
+        os.unlink(path)
+        return True
+
+    def _store(self, claimed: Job, result: JobResult) -> bool:
+        path = self._release(claimed)
+        if path is None:
+            return False
+        self._write(self._dir("results", f"{claimed.run_id}.result"), result)
+        os.unlink(path)
+        return True
+
+    def complete(self, claimed: Job, response: Any) -> bool:
+        return self._store(claimed, JobResult(claimed.run_id, JobStatus.COMPLETED, response, updated_at=time.time()))
+
+    def fail(self, claimed: Job, error: str) -> bool:
+        return self._store(claimed, JobResult(claimed.run_id, JobStatus.FAILED, error=error, updated_at=time.time()))
+
+    def result(self, run_id: str) -> Optional[JobResult]:
+        try:
+            with open(self._dir("results", f"{_check_run_id(run_id)}.result"), "rb") as f:
+                stored = pickle.load(f)
+        except FileNotFoundError:
+            stored = None
+        if stored is not None and stored.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+            return stored
+        # Segments move between queued/ and running/, so the stored status only tells that the run
+        # exists; runs queued before 'put' stored one are found by their segment
+        if self._running(run_id):
+            return JobResult(run_id, JobStatus.RUNNING)
+        if stored is not None or self._queued(run_id):
+            return JobResult(run_id, JobStatus.QUEUED, updated_at=stored.updated_at if stored is not None else 0.0)
+        return None
+
+    def delete(self, run_id: str) -> None:
+        paths = [self._dir("results", f"{_check_run_id(run_id)}.result"), *self._queued(run_id)]
+        paths.extend(self._dir("running", name) for name in self._running(run_id))
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
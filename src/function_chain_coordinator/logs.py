@@ -0,0 +1,175 @@
+# logs.py
+
+import copy
+import json
+import logging
+import os
+import re
+import reprlib
+import sys
+from typing import IO, Any, Optional
+
+LOGGER_NAME = "function_chain_coordinator"
+
+# Longest payload preview rendered into a log line; see 'configure_logging'
+PREVIEW_LENGTH = 200
+
+
+# ANSI color codes for colored logging
+class Colors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+
+
+class _PreviewRepr(reprlib.Repr):
+    def __init__(self, limit: int):
+        super().__init__()
+        self.maxstring = self.maxother = limit
+        self.maxlist = self.maxtuple = self.maxset = self.maxfrozenset = self.maxdeque = self.maxarray = 10
+        self.maxdict = 10
+
+
+class Preview:
+    """Log argument that renders a truncated view of a payload, and only if the record is emitted."""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        limit = self.limit or PREVIEW_LENGTH
+        if isinstance(self.value, str):
+            text = self.value
+        else:
+            # Containers are walked only as far as the preview needs
+            text = _PreviewRepr(limit).repr(self.value)
+        if len(text) > limit:
+            return f"{text[:limit]}... ({len(text)} chars)" if isinstance(self.value, str) else f"{text[:limit]}..."
+        return text
+
+    __repr__ = __str__
+
+
+def preview(value: Any, limit: Optional[int] = None) -> Preview:
+    return Preview(value, limit)
+
+
+class ColoredFormatter(logging.Formatter):
+    """Custom logging formatter to add colors based on log level, highlighting the message arguments."""
+
+    def format(self, record):
+        levelno = record.levelno
+        if levelno >= logging.ERROR:
+            color = Colors.FAIL
+        elif levelno >= logging.WARNING:
+            color = Colors.WARNING
+        elif levelno >= logging.INFO:
+            color = Colors.OKGREEN
+        elif levelno >= logging.DEBUG:
+            color = Colors.OKCYAN
+        else:
+            color = Colors.ENDC
+        # Work on a copy: other handlers must see the record unchanged
+        record = copy.copy(record)
+        record.msg = f"{color}{_highlight(record, color)}{Colors.ENDC}"
+        record.args = None
+        return super().format(record)
+
+
+# printf-style placeholders taking one positional argument each
+_PLACEHOLDER = re.compile(r"%[#0 +\-]*\d*(?:\.\d+)?[hlL]?[diouxXeEfFgGcrsa%]")
+
+
+def _highlight(record: logging.LogRecord, color: str) -> str:
+    """The record's message with each argument rendered by its own placeholder, then highlighted.
+
+    Messages the placeholders can't be matched up with (mapping arguments, ``*`` widths, a wrong
+    argument count) are rendered by ``getMessage`` without highlighting.
+    """
+    args = record.args
+    if not isinstance(args, tuple) or not args:
+        return record.getMessage()
+    msg = str(record.msg)
+    remaining = list(args)
+
+    def render(match):
+        spec = match.group()
+        if spec == "%%":
+            return "%"
+        return f"{Colors.OKBLUE}{spec % (remaining.pop(0),)}{color}"
+
+    try:
+        message = _PLACEHOLDER.sub(render, msg)
+    except (IndexError, TypeError, ValueError):
+        return record.getMessage()
+    if remaining or "%" in _PLACEHOLDER.sub("", msg):
+        return record.getMessage()
+    return message
+
+
+# Attributes every LogRecord has; anything else came in through 'extra'
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, without ANSI codes. Fields passed via ``extra`` are included."""
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    style: str = "color",
+    level: int = logging.INFO,
+    stream: Optional[IO[str]] = None,
+    preview_length: Optional[int] = None,
+) -> logging.Logger:
+    """Set how the package logs: ``'color'`` (the default), ``'plain'`` or ``'json'``.
+
+    Replaces the package logger's handler. The ``FCC_LOG_FORMAT`` environment variable picks the
+    style used at import time.
+    """
+    global PREVIEW_LENGTH
+    formatters = {
+        "color": lambda: ColoredFormatter('%(levelname)s: %(message)s'),
+        "plain": lambda: logging.Formatter('%(levelname)s: %(message)s'),
+        "json": JsonFormatter,
+    }
+    if style not in formatters:
+        raise ValueError(f"Invalid log style: {style}. Use 'color', 'plain' or 'json'.")
+    if preview_length is not None:
+        PREVIEW_LENGTH = preview_length
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(formatters[style]())
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    return logger
+
+
+_style = os.getenv("FCC_LOG_FORMAT", "color")
+try:
+    configure_logging(_style)
+except ValueError:
+    configure_logging("color")
+    logging.getLogger(LOGGER_NAME).warning("Unknown FCC_LOG_FORMAT %r; using 'color'.", _style)
@@ -0,0 +1,333 @@
+# metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Latency bucket upper bounds in seconds, from in-process functions up to slow LLM calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics). Not locked; ``Metrics`` guards it."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        # One slot per bound plus the +Inf overflow slot
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        buckets = []
+        running = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            running += bucket_count
+            buckets.append((repr(bound), running))
+        buckets.append(("+Inf", self.count))
+        return buckets
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class _NodeStats:
+    __slots__ = ("errors", "latency", "cache_hits", "cache_misses")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.errors = 0
+        self.latency = Histogram(buckets)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class _RouterStats:
+    __slots__ = (
+        "requests", "errors", "latency", "prompt_tokens", "completion_tokens", "cached_tokens", "prefix_cache_hits", "cache_hits", "cache_misses", "decisions",
+        "speculation_hits", "speculation_misses", "speculation_discarded", "input_tokens", "input_tokens_saved",
+    )
+
+    def __init__(self, buckets: Sequence[float]):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram(buckets)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        # Requests whose prompt prefix was served from the provider's prompt cache
+        self.prefix_cache_hits = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Decisions per deciding tier: a backend's name, 'cache' or 'llm'
+        self.decisions: Dict[str, int] = {}
+        # Speculative runs: decisions that chose a speculated branch, those that didn't, and runs thrown away
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self.speculation_discarded = 0
+        # Estimated tokens of routing inputs written into prompts, and tokens cut by the input budget
+        self.input_tokens = 0
+        self.input_tokens_saved = 0
+
+
+class Metrics:
+    """Thread-safe registry of per-node and per-router counters and latency histograms.
+
+    A coordinator created with ``metrics=True`` feeds one of these; pass the same instance to
+    several coordinators to aggregate them. Node latency covers the whole step (for routers that
+    includes the routing decision); LLM latency covers only the API request.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._started = time.monotonic()
+            self._nodes: Dict[str, _NodeStats] = {}
+            self._routers: Dict[str, _RouterStats] = {}
+
+    def _node(self, name: str) -> _NodeStats:
+        stats = self._nodes.get(name)
+        if stats is None:
+            stats = self._nodes[name] = _NodeStats(self.buckets)
+        return stats
+
+    def _router(self, name: str) -> _RouterStats:
+        stats = self._routers.get(name)
+        if stats is None:
+            stats = self._routers[name] = _RouterStats(self.buckets)
+        return stats
+
+    def observe_node(self, name: str, duration: float, error: bool = False, cached: Optional[bool] = None):
+        """Record one execution; ``cached`` says whether a memoized node's output came from its cache."""
+        with self._lock:
+            stats = self._node(name)
+            stats.latency.observe(duration)
+            if error:
+                stats.errors += 1
+            if cached is not None:
+                if cached:
+                    stats.cache_hits += 1
+                else:
+                    stats.cache_misses += 1
+
+    def observe_llm(self, router: str, duration: float, usage: Any = None, error: bool = False):
+        """Record one routing request; ``usage`` is the completion's ``usage`` object, if any."""
+        with self._lock:
+            stats = self._router(router)
+            stats.requests += 1
+            stats.latency.observe(duration)
+            if error:
+                stats.errors += 1
+            if usage is not None:
+                stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+                details = getattr(usage, "prompt_tokens_details", None)
+                cached = getattr(details, "cached_tokens", 0) or 0
+                stats.cached_tokens += cached
+                if cached:
+                    stats.prefix_cache_hits += 1
+
+    def observe_cache(self, router: str, hit: bool):
+        with self._lock:
+            stats = self._router(router)
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def observe_route(self, router: str, tier: str):
+        with self._lock:
+            decisions = self._router(router).decisions
+            decisions[tier] = decisions.get(tier, 0) + 1
+
+    def observe_speculation(self, router: str, hit: bool, discarded: int):
+        with self._lock:
+            stats = self._router(router)
+            if hit:
+                stats.speculation_hits += 1
+            else:
+                stats.speculation_misses += 1
+            stats.speculation_discarded += discarded
+
+    def observe_input(self, router: str, sent: int, saved: int):
+        with self._lock:
+            stats = self._router(router)
+            stats.input_tokens += sent
+            stats.input_tokens_saved += saved
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Point-in-time copy of every metric as plain dicts."""
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            nodes = {}
+            for name, stats in self._nodes.items():
+                latency = stats.latency.as_dict()
+                nodes[name] = {
+                    "calls": latency["count"],
+                    "errors": stats.errors,
+                    "calls_per_second": latency["count"] / uptime if uptime > 0 else 0.0,
+                    "latency_seconds": latency,
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                }
+            routers = {}
+            for name, stats in self._routers.items():
+                lookups = stats.cache_hits + stats.cache_misses
+                routers[name] = {
+                    "llm_requests": stats.requests,
+                    "llm_errors": stats.errors,
+                    "llm_latency_seconds": stats.latency.as_dict(),
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "cached_tokens": stats.cached_tokens,
+                    "prefix_cache_hits": stats.prefix_cache_hits,
+                    "prefix_cache_hit_rate": stats.prefix_cache_hits / stats.requests if stats.requests else 0.0,
+                    "cached_token_ratio": stats.cached_tokens / stats.prompt_tokens if stats.prompt_tokens else 0.0,
+                    "total_tokens": stats.prompt_tokens + stats.completion_tokens,
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                    "cache_hit_rate": stats.cache_hits / lookups if lookups else 0.0,
+                    "decisions": dict(stats.decisions),
+                    "speculation_hits": stats.speculation_hits,
+                    "speculation_misses": stats.speculation_misses,
+                    "speculation_discarded": stats.speculation_discarded,
+                    "input_tokens": stats.input_tokens,
+                    "input_tokens_saved": stats.input_tokens_saved,
+                }
+        return {"started_at": self.started_at, "uptime_seconds": uptime, "nodes": nodes, "routers": routers}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _histogram_lines(name: str, labels: str, histogram: Dict[str, Any]) -> List[str]:
+    lines = [f'{name}_bucket{{{labels},le="{le}"}} {count}' for le, count in histogram["buckets"].items()]
+    lines.append(f"{name}_sum{{{labels}}} {histogram['sum']!r}")
+    lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+    return lines
+
+
+def render_prometheus(snapshot: Dict[str, Any], prefix: str = "fcc") -> str:
+    """Render a ``Metrics.snapshot()`` (optionally with ``caches`` and ``rate_limiter`` sections) in the Prometheus text format."""
+    families: List[Tuple[str, str, str, List[str]]] = []
+
+    def family(name: str, kind: str, help_text: str) -> List[str]:
+        samples: List[str] = []
+        families.append((f"{prefix}_{name}", kind, help_text, samples))
+        return samples
+
+    node_calls = family("node_calls_total", "counter", "Node executions, including failed ones.")
+    node_errors = family("node_errors_total", "counter", "Node executions that raised.")
+    node_latency = family("node_duration_seconds", "histogram", "Node execution wall time.")
+    node_cache = family("node_cache_lookups_total", "counter", "Memoized node calls by cache result.")
+    for node, stats in snapshot.get("nodes", {}).items():
+        labels = f'node="{_escape(node)}"'
+        node_calls.append(f"{prefix}_node_calls_total{{{labels}}} {stats['calls']}")
+        node_errors.append(f"{prefix}_node_errors_total{{{labels}}} {stats['errors']}")
+        node_latency.extend(_histogram_lines(f"{prefix}_node_duration_seconds", labels, stats["latency_seconds"]))
+        if stats["cache_hits"] or stats["cache_misses"]:
+            node_cache.append(f'{prefix}_node_cache_lookups_total{{{labels},result="hit"}} {stats["cache_hits"]}')
+            node_cache.append(f'{prefix}_node_cache_lookups_total{{{labels},result="miss"}} {stats["cache_misses"]}')
+
+    decisions = family("router_decisions_total", "counter", "Routing decisions by the tier that made them.")
+    llm_requests = family("llm_requests_total", "counter", "Routing requests sent to the LLM.")
+    llm_errors = family("llm_errors_total", "counter", "Routing requests that failed.")
+    llm_latency = family("llm_request_duration_seconds", "histogram", "Routing request latency.")
+    llm_tokens = family("llm_tokens_total", "counter", "Tokens used by routing requests.")
+    prefix_hits = family("llm_prefix_cache_hits_total", "counter", "Routing requests served partly from the provider's prompt cache.")
+    route_cache = family("routing_cache_lookups_total", "counter", "Routing cache lookups by result.")
+    speculations = family("speculations_total", "counter", "Speculated router decisions by whether a speculated branch was chosen.")
+    discarded = family("speculative_runs_discarded_total", "counter", "Speculative branch runs whose results were thrown away.")
+    input_tokens = family("router_input_tokens_total", "counter", "Routing input tokens written into prompts, and tokens cut by the input budget.")
+    for router, stats in snapshot.get("routers", {}).items():
+        labels = f'router="{_escape(router)}"'
+        for tier, count in stats["decisions"].items():
+            decisions.append(f'{prefix}_router_decisions_total{{{labels},tier="{_escape(tier)}"}} {count}')
+        llm_requests.append(f"{prefix}_llm_requests_total{{{labels}}} {stats['llm_requests']}")
+        llm_errors.append(f"{prefix}_llm_errors_total{{{labels}}} {stats['llm_errors']}")
+        llm_latency.extend(_histogram_lines(f"{prefix}_llm_request_duration_seconds", labels, stats["llm_latency_seconds"]))
+        for kind in ("prompt", "completion", "cached"):
+            llm_tokens.append(f'{prefix}_llm_tokens_total{{{labels},type="{kind}"}} {stats[kind + "_tokens"]}')
+        prefix_hits.append(f"{prefix}_llm_prefix_cache_hits_total{{{labels}}} {stats['prefix_cache_hits']}")
+        route_cache.append(f'{prefix}_routing_cache_lookups_total{{{labels},result="hit"}} {stats["cache_hits"]}')
+        route_cache.append(f'{prefix}_routing_cache_lookups_total{{{labels},result="miss"}} {stats["cache_misses"]}')
+        if stats["speculation_hits"] or stats["speculation_misses"]:
+            speculations.append(f'{prefix}_speculations_total{{{labels},result="hit"}} {stats["speculation_hits"]}')
+            speculations.append(f'{prefix}_speculations_total{{{labels},result="miss"}} {stats["speculation_misses"]}')
+            discarded.append(f"{prefix}_speculative_runs_discarded_total{{{labels}}} {stats['speculation_discarded']}")
+        if stats["input_tokens"] or stats["input_tokens_saved"]:
+            input_tokens.append(f'{prefix}_router_input_tokens_total{{{labels},type="sent"}} {stats["input_tokens"]}')
+            input_tokens.append(f'{prefix}_router_input_tokens_total{{{labels},type="saved"}} {stats["input_tokens_saved"]}')
+
+    caches = snapshot.get("caches", {})
+    if caches:
+        cache_hits = family("cache_hits_total", "counter", "Cache backend hits.")
+        cache_misses = family("cache_misses_total", "counter", "Cache backend misses.")
+        cache_evictions = family("cache_evictions_total", "counter", "Cache backend evictions.")
+        for cache, stats in caches.items():
+            labels = f'cache="{_escape(cache)}"'
+            cache_hits.append(f"{prefix}_cache_hits_total{{{labels}}} {stats['hits']}")
+            cache_misses.append(f"{prefix}_cache_misses_total{{{labels}}} {stats['misses']}")
+            cache_evictions.append(f"{prefix}_cache_evictions_total{{{labels}}} {stats['evictions']}")
+
+    limiter = snapshot.get("rate_limiter")
+    if limiter:
+        limited = family("llm_rate_limited_requests_total", "counter", "Rate-limited LLM requests by outcome.")
+        for outcome in ("requests", "retries", "throttled", "errors", "failed"):
+            limited.append(f'{prefix}_llm_rate_limited_requests_total{{outcome="{outcome}"}} {limiter[outcome]}')
+        family("llm_rate_limit_wait_seconds_total", "counter", "Time LLM requests waited for quota.").append(
+            f"{prefix}_llm_rate_limit_wait_seconds_total {limiter['waited_seconds']}"
+        )
+        family("llm_concurrency_limit", "gauge", "Current adaptive concurrency limit for LLM requests.").append(
+            f"{prefix}_llm_concurrency_limit {limiter['concurrency_limit']}"
+        )
+
+    lines = []
+    for name, kind, help_text, samples in families:
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,309 @@
+# ratelimit.py
+
+import asyncio
+import collections
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Sequence
+
+import openai
+
+from .reducers import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """``rate`` units per second with bursts of up to ``capacity``.
+
+    ``reserve`` takes units immediately, letting the level go negative, and returns how long the
+    caller must wait before using them, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level -= amount
+            return -self._level / self.rate if self._level < 0 else 0.0
+
+    def refund(self, amount: float):
+        """Return units reserved but not used (negative to charge more)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self.capacity, self._level + amount)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit adjusted by additive increase / multiplicative decrease (AIMD).
+
+    Every successful request raises the limit by ``increase / limit`` (about ``increase`` per round
+    of requests); a throttled one multiplies it by ``decrease``, at most once for requests started
+    before the previous decrease. Waiting callers, threads or coroutines, are admitted in order.
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64, increase: float = 1.0, decrease: float = 0.5):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("Concurrency limits must satisfy 1 <= minimum <= initial <= maximum.")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1.")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[Callable[[], None]] = collections.deque()
+        self._lock = threading.Lock()
+
+    def _admit(self) -> bool:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._admit():
+                return
+            event = threading.Event()
+            self._waiters.append(event.set)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            if future.cancelled():
+                self.release()
+            else:
+                future.set_result(None)
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(grant)
+            except RuntimeError:
+                # The waiter's event loop is closed
+                self.release()
+
+        with self._lock:
+            if self._admit():
+                return
+            self._waiters.append(wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Cancelled after the slot was granted
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self, throttled: bool = False, succeeded: bool = False, started: float = 0.0):
+        """Free a slot; ``throttled`` and ``succeeded`` (with the request's start time) adjust the limit."""
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                if started >= self._last_decrease:
+                    self.limit = max(float(self.minimum), self.limit * self.decrease)
+                    self._last_decrease = time.monotonic()
+                    logger.warning("LLM requests throttled; concurrency limit lowered to %s", int(self.limit))
+            elif succeeded:
+                self.limit = min(float(self.maximum), self.limit + self.increase / self.limit)
+            wakes = []
+            while self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                wakes.append(self._waiters.popleft())
+        for wake in wakes:
+            wake()
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait (``retry-after-ms`` or ``retry-after``), if it said."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        milliseconds = headers.get("retry-after-ms")
+        if milliseconds is not None:
+            return max(float(milliseconds) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            # An HTTP date
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _classify(error: BaseException) -> Optional[str]:
+    """'throttled', 'transient' (worth retrying) or None."""
+    if isinstance(error, openai.APIConnectionError):
+        return "transient"
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        # Out of credit is not going to pass by waiting
+        return None if getattr(error, "code", None) == "insufficient_quota" else "throttled"
+    if status in (408, 409) or (status is not None and status >= 500):
+        return "transient"
+    return None
+
+
+class RateLimiter:
+    """Client-side limits for LLM requests, shared by every router using the same ``OpenAIClients``.
+
+    Requests wait for ``requests_per_minute`` and ``tokens_per_minute`` quota (token use is
+    estimated from the prompt plus ``completion_tokens``, then corrected from the response's
+    usage) and for a slot under an ``AdaptiveConcurrency`` limit. Throttled (429), timed-out and
+    5xx requests are retried up to ``max_retries`` times with full-jitter exponential backoff.
+    A ``retry-after`` from the server holds back every request, not just the throttled one.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        completion_tokens: int = 256,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Bursts of up to one second's worth of quota
+        self._requests = TokenBucket(requests_per_minute / 60, max(requests_per_minute / 60, 1.0)) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 60) if tokens_per_minute else None
+        self.concurrency = concurrency if concurrency is not None else AdaptiveConcurrency()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.completion_tokens = completion_tokens
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = collections.Counter()
+
+    def estimate(self, messages: Sequence[Dict[str, Any]], model: Optional[str] = None) -> int:
+        """Tokens a request will use, for the tokens-per-minute quota (0 without one)."""
+        if self._tokens is None:
+            return 0
+        return sum(count_tokens(str(message.get("content", "")), model) for message in messages) + self.completion_tokens
+
+    def _delay(self, tokens: int) -> float:
+        """Reserve quota for one request; returns how long to wait before sending it."""
+        delay = 0.0
+        if self._requests is not None:
+            delay = self._requests.reserve(1)
+        if self._tokens is not None and tokens:
+            delay = max(delay, self._tokens.reserve(tokens))
+        with self._lock:
+            delay = max(delay, self._paused_until - time.monotonic())
+            if delay > 0:
+                self._stats["waited_seconds"] += delay
+        return delay
+
+    def _settled(self, result: Any, tokens: int):
+        usage = getattr(result, "usage", None)
+        used = getattr(usage, "total_tokens", None)
+        if self._tokens is not None and isinstance(used, int):
+            self._tokens.refund(tokens - used)
+        with self._lock:
+            self._stats["requests"] += 1
+
+    def _backoff(self, error: BaseException, attempt: int, started: float) -> Optional[float]:
+        """Release the slot and return the delay before retrying, or None to give up."""
+        kind = _classify(error)
+        self.concurrency.release(throttled=kind == "throttled", started=started)
+        with self._lock:
+            self._stats["throttled" if kind == "throttled" else "errors"] += 1
+            if kind is None or attempt >= self.max_retries:
+                self._stats["failed"] += 1
+                return None
+            self._stats["retries"] += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            requested = retry_after(error)
+            if requested is not None:
+                # Everyone waits out the server's request; jitter spreads the restart
+                self._paused_until = max(self._paused_until, time.monotonic() + requested)
+                delay = requested + random.uniform(0, self.base_delay)
+        logger.warning("LLM request %s (%s); retry %s/%s in %.2fs", kind, type(error).__name__, attempt + 1, self.max_retries, delay)
+        return delay
+
+    def call(self, request: Callable[[], Any], tokens: int = 0) -> Any:
+        """Send ``request()`` within the limits, retrying throttled and transient failures."""
+        attempt = 0
+        while True:
+            delay = self._delay(tokens)
+            if delay > 0:
+                time.sleep(delay)
+            self.concurrency.acquire()
+            started = time.monotonic()
+            try:
+                result = request()
+            except Exception as e:
+                delay = self._backoff(e, attempt, started)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.concurrency.release()
+                raise
+            self.concurrency.release(succeeded=True)
+            self._settled(result, tokens)
+            return result
+
+    async def acall(self, request: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """Asynchronous counterpart of ``call``; ``request`` returns a new awaitable on every call."""
+        attempt = 0
+        while True:
+            delay = self._delay(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.concurrency.aacquire()
+            started = time.monotonic()
+            try:
+                result = await request()
+            except Exception as e:
+                delay = self._backoff(e, attempt, started)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # e.g. the task was cancelled
+                self.concurrency.release()
+                raise
+            self.concurrency.release(succeeded=True)
+            self._settled(result, tokens)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {key: self._stats[key] for key in ("requests", "retries", "throttled", "errors", "failed")}
+            stats["waited_seconds"] = self._stats["waited_seconds"]
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["in_flight"] = self.concurrency.in_flight
+        return stats
+
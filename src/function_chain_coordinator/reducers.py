@@ -0,0 +1,112 @@
+# reducers.py
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, List, Optional
+
+# Rough characters per token for English text, used when tiktoken isn't installed
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]) -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # e.g. the encoding files can't be downloaded
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens in ``text`` for ``model``: exact when tiktoken is installed, estimated otherwise."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class InputReducer:
+    """Shortens a routing input's text to fit a token budget.
+
+    Subclasses implement ``reduce_chars``; ``reduce`` converts the token budget to characters using
+    the text's own characters-per-token ratio and shrinks the target until the result fits.
+    """
+
+    def reduce(self, text: str, budget: int, count: Callable[[str], int]) -> str:
+        tokens = count(text)
+        if tokens <= budget:
+            return text
+        max_chars = int(len(text) * budget / tokens)
+        while True:
+            reduced = self.reduce_chars(text, max_chars)
+            if max_chars <= 0 or count(reduced) <= budget:
+                return reduced
+            max_chars = int(max_chars * 0.9)
+
+    def reduce_chars(self, text: str, max_chars: int) -> str:
+        raise NotImplementedError
+
+
+class TruncateReducer(InputReducer):
+    """Keeps the beginning of the text."""
+
+    def reduce_chars(self, text: str, max_chars: int) -> str:
+        return text[:max(max_chars, 0)]
+
+
+class HeadTailReducer(InputReducer):
+    """Keeps the beginning and the end of the text, joined by ``marker``; ``head_fraction`` of the budget goes to the beginning."""
+
+    def __init__(self, head_fraction: float = 0.5, marker: str = " [...] "):
+        if not 0.0 <= head_fraction <= 1.0:
+            raise ValueError("head_fraction must be between 0 and 1.")
+        self.head_fraction = head_fraction
+        self.marker = marker
+
+    def reduce_chars(self, text: str, max_chars: int) -> str:
+        keep = max_chars - len(self.marker)
+        if keep <= 0:
+            return text[:max(max_chars, 0)]
+        head = int(keep * self.head_fraction)
+        return text[:head] + self.marker + text[len(text) - (keep - head):]
+
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w{3,}")
+
+
+class ExtractiveReducer(InputReducer):
+    """Local extractive summary: the sentences whose words are most frequent in the whole text,
+    kept in their original order. The first sentence (often a title or lead) is always tried first."""
+
+    def __init__(self, separator: str = " "):
+        self.separator = separator
+
+    def reduce_chars(self, text: str, max_chars: int) -> str:
+        sentences = [sentence.strip() for sentence in _SENTENCE.split(text) if sentence.strip()]
+        frequencies = Counter(word.lower() for word in _WORD.findall(text))
+
+        def score(index: int) -> float:
+            words = _WORD.findall(sentences[index])
+            if not words:
+                return 0.0
+            return sum(frequencies[word.lower()] for word in words) / len(words)
+
+        order = [0] + sorted(range(1, len(sentences)), key=score, reverse=True) if sentences else []
+        chosen: List[int] = []
+        used = 0
+        for index in order:
+            cost = len(sentences[index]) + (len(self.separator) if chosen else 0)
+            if used + cost <= max_chars:
+                chosen.append(index)
+                used += cost
+        if not chosen:
+            return text[:max(max_chars, 0)]
+        return self.separator.join(sentences[index] for index in sorted(chosen))
@@ -0,0 +1,363 @@
+# routing.py
+
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence, Tuple, Union
+
+# A routing target: a registered function or its name
+Target = Union[str, Callable]
+
+_WORD = re.compile(r"\w+")
+
+
+def _target_name(target: Target) -> str:
+    return target if isinstance(target, str) else target.__name__
+
+
+def _confidence(value: Any) -> Optional[float]:
+    """A backend's confidence as a float, or None when it is missing or not a number."""
+    try:
+        confidence = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(confidence) else confidence
+
+
+def _tokens(text: str) -> List[str]:
+    """Words plus their character trigrams, so 'robbed' still matches 'robbery'."""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if len(word) < 2:
+            continue
+        tokens.append(word)
+        padded = f" {word} "
+        tokens.extend(padded[index:index + 3] for index in range(len(padded) - 2))
+    return tokens
+
+
+class RouterBackend:
+    """Local alternative to the LLM for choosing a router's next function.
+
+    Subclasses implement ``choose`` (a candidate name, or None to abstain) or, when they can tell how
+    sure they are, ``score`` (a name and a confidence in [0, 1]). An abstaining backend, or one below
+    the router's ``confidence_threshold`` or without a numeric confidence, hands the decision to the
+    LLM when the router has a ``direction_prompt``.
+    """
+
+    # Label of this tier in step records and metrics; defaults to the class name
+    name: Optional[str] = None
+
+    @property
+    def tier(self) -> str:
+        return self.name or type(self).__name__
+
+    def choose(self, input_value: Any, candidates: Sequence[Any]) -> Optional[str]:
+        return self.score(input_value, candidates)[0]
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        choice = self.choose(input_value, candidates)
+        return choice, 1.0 if choice is not None else 0.0
+
+    def decide(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float, str]:
+        """The choice, its confidence and the tier that made it."""
+        choice, confidence = self.score(input_value, candidates)
+        return choice, confidence, self.tier
+
+    async def adecide(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float, str]:
+        # Local backends are CPU-only and fast, so the default runs inline
+        return self.decide(input_value, candidates)
+
+    def observe(self, input_value: Any, function_name: str):
+        """Called with each decision the LLM made after this backend deferred; learning backends use it."""
+
+
+class FunctionBackend(RouterBackend):
+    """Routes with a plain function of the input that returns a target (or None to abstain)."""
+
+    def __init__(self, func: Callable[[Any], Optional[Target]]):
+        self.func = func
+
+    def choose(self, input_value: Any, candidates: Sequence[Any]) -> Optional[str]:
+        target = self.func(input_value)
+        return None if target is None else _target_name(target)
+
+
+class RulesBackend(RouterBackend):
+    """Ordered ``(predicate, target)`` table; the first predicate that holds for the input wins."""
+
+    def __init__(
+        self,
+        rules: Sequence[Tuple[Callable[[Any], bool], Target]],
+        default: Optional[Target] = None,
+        default_confidence: float = 1.0,
+    ):
+        self.rules = [(predicate, _target_name(target)) for predicate, target in rules]
+        self.default = None if default is None else _target_name(default)
+        self.default_confidence = default_confidence
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        for predicate, name in self.rules:
+            if predicate(input_value):
+                return name, 1.0
+        return self.default, self.default_confidence if self.default is not None else 0.0
+
+
+class KeywordBackend(RouterBackend):
+    """Matches keywords or regular expressions against the input's text.
+
+    ``patterns`` maps each target to its keywords/regexes. The target with the most matching
+    patterns wins, ties going to the one listed first; with no match the backend returns ``default``.
+    Confidence is the winner's share of all matches.
+    """
+
+    def __init__(
+        self,
+        patterns: Dict[Target, Sequence[Union[str, Pattern]]],
+        default: Optional[Target] = None,
+        ignore_case: bool = True,
+    ):
+        flags = re.IGNORECASE if ignore_case else 0
+        self.patterns = [
+            (_target_name(target), [p if isinstance(p, re.Pattern) else re.compile(p, flags) for p in target_patterns])
+            for target, target_patterns in patterns.items()
+        ]
+        self.default = None if default is None else _target_name(default)
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        text = str(input_value)
+        best, best_hits, total_hits = None, 0, 0
+        for name, compiled in self.patterns:
+            hits = sum(1 for pattern in compiled if pattern.search(text))
+            total_hits += hits
+            if hits > best_hits:
+                best, best_hits = name, hits
+        if best is None:
+            return self.default, 0.0
+        return best, best_hits / total_hits
+
+
+class NearestNeighbourBackend(RouterBackend):
+    """TF-IDF cosine similarity between the input and each candidate's ``description_for_routing``.
+
+    Labelled ``examples`` (target -> sample inputs) are added to a candidate's text. With ``learn``
+    set, inputs the LLM routed after this backend deferred become examples too (at most
+    ``max_examples`` per target, newest kept). Confidence is the best cosine similarity; the backend
+    abstains below ``min_similarity``.
+    """
+
+    def __init__(
+        self,
+        examples: Optional[Dict[Target, Sequence[str]]] = None,
+        min_similarity: float = 0.05,
+        learn: bool = False,
+        max_examples: int = 200,
+    ):
+        self.examples = {_target_name(target): list(texts) for target, texts in (examples or {}).items()}
+        self.min_similarity = min_similarity
+        self.learn = learn
+        self.max_examples = max_examples
+        # Candidate sets are fixed per compiled plan, so their vectors are built once
+        self._index: Dict[Tuple[Tuple[str, str], ...], Tuple[Dict[str, float], List[Tuple[str, Dict[str, float], float]]]] = {}
+        # Guards 'examples' and '_index' against 'observe' running alongside 'score'
+        self._lock = threading.Lock()
+
+    def _document(self, candidate: Any) -> str:
+        name = candidate.func.__name__
+        return " ".join([name.replace("_", " "), candidate.description_for_routing or "", *self.examples.get(name, [])])
+
+    def _build(self, candidates: Sequence[Any]):
+        documents = [(candidate.func.__name__, Counter(_tokens(self._document(candidate)))) for candidate in candidates]
+        document_frequency = Counter(token for _, counts in documents for token in counts)
+        idf = {token: math.log((1 + len(documents)) / (1 + frequency)) + 1 for token, frequency in document_frequency.items()}
+        vectors = []
+        for name, counts in documents:
+            vector = {token: count * idf[token] for token, count in counts.items()}
+            vectors.append((name, vector, math.sqrt(sum(weight * weight for weight in vector.values()))))
+        return idf, vectors
+
+    def observe(self, input_value: Any, function_name: str):
+        if not self.learn:
+            return
+        with self._lock:
+            examples = self.examples.setdefault(function_name, [])
+            examples.append(str(input_value))
+            del examples[:-self.max_examples]
+            # Rebuilt lazily on the next decision
+            self._index = {}
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        key = tuple((candidate.func.__name__, candidate.description_for_routing or "") for candidate in candidates)
+        with self._lock:
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = self._build(candidates)
+        # A built index is never changed, only replaced
+        idf, vectors = index
+        query = {token: count * idf[token] for token, count in Counter(_tokens(str(input_value))).items() if token in idf}
+        query_norm = math.sqrt(sum(weight * weight for weight in query.values()))
+        if not query_norm:
+            return None, 0.0
+        best, best_score = None, self.min_similarity
+        for name, vector, norm in vectors:
+            if not norm:
+                continue
+            score = sum(weight * vector.get(token, 0.0) for token, weight in query.items()) / (query_norm * norm)
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = name, score
+        return best, best_score if best is not None else 0.0
+
+
+class ClassifierBackend(RouterBackend):
+    """Wraps a trained classifier with a scikit-learn style ``predict``/``predict_proba``.
+
+    The model must predict function names. ``featurize`` turns an input into one feature row (the raw
+    input by default, e.g. for a text pipeline). Confidence is the top class probability when the
+    model has ``predict_proba``; with ``min_confidence`` it must reach that value, or the backend abstains.
+    """
+
+    def __init__(self, model: Any, featurize: Optional[Callable[[Any], Any]] = None, min_confidence: Optional[float] = None):
+        self.model = model
+        self.featurize = featurize
+        self.min_confidence = min_confidence
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        row = self.featurize(input_value) if self.featurize is not None else input_value
+        if not hasattr(self.model, "predict_proba"):
+            return str(self.model.predict([row])[0]), 1.0
+        probabilities = list(self.model.predict_proba([row])[0])
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        if self.min_confidence is not None and probabilities[best] < self.min_confidence:
+            return None, probabilities[best]
+        return str(self.model.classes_[best]), probabilities[best]
+
+
+class CascadeBackend(RouterBackend):
+    """Tries ``(backend, threshold)`` tiers in order, cheapest first.
+
+    The first tier whose confidence reaches its threshold decides, and its ``tier`` name is what
+    gets recorded. When every tier falls short the cascade abstains, so the router escalates to the
+    LLM; give the last tier a threshold of 0 to always answer locally.
+    """
+
+    def __init__(self, tiers: Sequence[Tuple[RouterBackend, float]]):
+        if not tiers:
+            raise ValueError("A cascade needs at least one tier.")
+        self.tiers = list(tiers)
+
+    def decide(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float, str]:
+        for backend, threshold in self.tiers:
+            choice, confidence, tier = backend.decide(input_value, candidates)
+            # A tier that reports no usable confidence is never sure enough to decide
+            confidence = _confidence(confidence)
+            if choice is not None and confidence is not None and confidence >= threshold:
+                return choice, confidence, tier
+        return None, 0.0, self.tier
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        choice, confidence, _ = self.decide(input_value, candidates)
+        return choice, confidence
+
+    def observe(self, input_value: Any, function_name: str):
+        for backend, _ in self.tiers:
+            backend.observe(input_value, function_name)
+
+
+class NaiveBayesBackend(RouterBackend):
+    """Multinomial naive Bayes over words and character trigrams of the input's text.
+
+    Small enough to train in-process from a decision log (see ``distill``) and to serialize as JSON.
+    Only labels that are current candidates are scored; confidence is the winner's posterior
+    probability among them. With ``learn`` set it keeps training on the LLM's decisions.
+    """
+
+    def __init__(self, alpha: float = 1.0, learn: bool = False, name: Optional[str] = None):
+        self.alpha = alpha
+        self.learn = learn
+        self.name = name
+        self.label_counts: Counter = Counter()
+        self.token_counts: Dict[str, Counter] = {}
+        self.token_totals: Counter = Counter()
+        self.vocabulary: set = set()
+        # Learning from concurrent runs must not lose counts or score half-updated ones
+        self._lock = threading.RLock()
+
+    def partial_fit(self, texts: Sequence[str], labels: Sequence[str]) -> 'NaiveBayesBackend':
+        with self._lock:
+            for text, label in zip(texts, labels):
+                tokens = _tokens(str(text))
+                self.label_counts[label] += 1
+                self.token_counts.setdefault(label, Counter()).update(tokens)
+                self.token_totals[label] += len(tokens)
+                self.vocabulary.update(tokens)
+        return self
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> 'NaiveBayesBackend':
+        with self._lock:
+            self.label_counts, self.token_counts, self.token_totals, self.vocabulary = Counter(), {}, Counter(), set()
+            return self.partial_fit(texts, labels)
+
+    def observe(self, input_value: Any, function_name: str):
+        if self.learn:
+            self.partial_fit([str(input_value)], [function_name])
+
+    def probabilities(self, input_value: Any, labels: Sequence[str]) -> Dict[str, float]:
+        """Posterior probability of each known label among ``labels``."""
+        with self._lock:
+            return self._probabilities(input_value, labels)
+
+    def _probabilities(self, input_value: Any, labels: Sequence[str]) -> Dict[str, float]:
+        labels = [label for label in labels if self.label_counts.get(label)]
+        if not labels:
+            return {}
+        tokens = [token for token in _tokens(str(input_value)) if token in self.vocabulary]
+        total = sum(self.label_counts[label] for label in labels)
+        vocabulary_size = len(self.vocabulary)
+        log_scores = {}
+        for label in labels:
+            counts = self.token_counts[label]
+            denominator = math.log(self.token_totals[label] + self.alpha * vocabulary_size)
+            log_scores[label] = math.log(self.label_counts[label] / total) + sum(
+                math.log(counts.get(token, 0) + self.alpha) - denominator for token in tokens
+            )
+        peak = max(log_scores.values())
+        weights = {label: math.exp(score - peak) for label, score in log_scores.items()}
+        norm = sum(weights.values())
+        return {label: weight / norm for label, weight in weights.items()}
+
+    def score(self, input_value: Any, candidates: Sequence[Any]) -> Tuple[Optional[str], float]:
+        probabilities = self.probabilities(input_value, [candidate.func.__name__ for candidate in candidates])
+        if not probabilities:
+            return None, 0.0
+        best = max(probabilities, key=probabilities.__getitem__)
+        return best, probabilities[best]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "type": "naive_bayes",
+                "alpha": self.alpha,
+                "label_counts": dict(self.label_counts),
+                "token_counts": {label: dict(counts) for label, counts in self.token_counts.items()},
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **kwargs) -> 'NaiveBayesBackend':
+        backend = cls(alpha=data.get("alpha", 1.0), **kwargs)
+        backend.label_counts = Counter(data["label_counts"])
+        for label, counts in data["token_counts"].items():
+            backend.token_counts[label] = Counter(counts)
+            backend.token_totals[label] = sum(counts.values())
+            backend.vocabulary.update(counts)
+        return backend
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'NaiveBayesBackend':
+        with open(path) as f:
+            return cls.from_dict(json.load(f), **kwargs)
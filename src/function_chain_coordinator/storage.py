@@ -0,0 +1,34 @@
+# storage.py
+"""Helpers shared by the SQLite- and file-backed caches, checkpoint stores and job queues."""
+
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+from typing import Any
+
+
+def connect_per_thread(local: threading.local, path: str, **kwargs: Any) -> sqlite3.Connection:
+    """The calling thread's connection to the database at ``path``, opened in WAL mode on first use."""
+    # sqlite3 connections must not be shared between threads
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30.0, **kwargs)
+        conn.execute("PRAGMA journal_mode=WAL")
+        local.conn = conn
+    return conn
+
+
+def dump_atomic(path: str, *values: Any) -> None:
+    """Pickle ``values``, one after another, to ``path`` through a temporary file in the same directory."""
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for value in values:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # A crash mid-write leaves the previous file intact
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
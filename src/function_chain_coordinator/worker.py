@@ -0,0 +1,72 @@
+# worker.py
+"""Execute runs queued with ``Coordinator.submit``.
+
+    coordinator-worker myapp.chains:coordinator --pool default --concurrency 4
+    coordinator-worker myapp.chains --pool llm
+
+The target is ``module:attribute`` naming a ``Coordinator`` (or a function returning one), or just
+a module that sets up ``CoordinatorInstance``. The coordinator must have a ``job_queue``.
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import Optional, Sequence
+
+from .function_chain_coordinator import Coordinator, CoordinatorInstance
+from .jobs import DEFAULT_POOL
+from .logs import configure_logging
+
+
+def load_coordinator(target: str) -> Coordinator:
+    module_name, _, attribute = target.partition(":")
+    # Console scripts don't put the working directory on the path
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    if not attribute:
+        return CoordinatorInstance.get_instance()
+    coordinator = getattr(module, attribute)
+    if not isinstance(coordinator, Coordinator) and callable(coordinator):
+        coordinator = coordinator()
+    if not isinstance(coordinator, Coordinator):
+        raise TypeError(f"'{target}' is not a Coordinator.")
+    return coordinator
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(prog="coordinator-worker", description="Execute runs queued with Coordinator.submit.")
+    parser.add_argument("target", help="module:attribute of the Coordinator, or a module using CoordinatorInstance")
+    parser.add_argument("--pool", action="append", dest="pools", help=f"pool to serve; repeatable (default: '{DEFAULT_POOL}')")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs to run at once")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds to wait when the queue is empty")
+    parser.add_argument("--lease", type=float, default=600.0, help="seconds before an unfinished job is given to another worker")
+    parser.add_argument("--max-jobs", type=int, default=None, help="exit after this many jobs")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    configure_logging(level=getattr(logging, args.log_level.upper()))
+    coordinator = load_coordinator(args.target)
+    stop = threading.Event()
+    # Finish the jobs in hand, then exit
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stop.set())
+    try:
+        coordinator.work(
+            pools=args.pools or (DEFAULT_POOL,),
+            concurrency=args.concurrency,
+            poll_interval=args.poll_interval,
+            lease=args.lease,
+            max_jobs=args.max_jobs,
+            stop=stop,
+        )
+    finally:
+        coordinator.close()
+
+
+if __name__ == "__main__":
+    main()